@@ -1,23 +1,42 @@
 # fall_detector.py - Updated version with warning fixes
 import joblib
 import numpy as np
-import pandas as pd
-from collections import deque
 import time
 import warnings
 
+from fast_kernels import fall_features
+
 # Suppress sklearn warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='sklearn')
 
+# Number of recent readings kept by the detector
+HISTORY_SIZE = 10
+
+# "Still" gate: skip the model while the last STILL_WINDOW accel magnitudes
+# span less than STILL_RANGE g and the current one is within STILL_TOLERANCE of 1g
+STILL_WINDOW = 20
+STILL_RANGE = 0.15
+STILL_TOLERANCE = 0.1
+
 class RealTimeFallDetector:
     def __init__(self, model_path):
         """Load the trained Random Forest model"""
         try:
             self.model = joblib.load(model_path)
-            self.data_buffer = deque(maxlen=10)
+            # Magnitudes of recent readings as ring buffers, stored at write
+            # time so they're never recomputed
+            self._mag_acc = np.zeros(HISTORY_SIZE)
+            self._mag_gyr = np.zeros(HISTORY_SIZE)
+            self._i = 0  # total readings written; next slot is _i % HISTORY_SIZE
+            # Longer accel-magnitude window for the still gate (NaN until filled)
+            self._still_mags = np.full(STILL_WINDOW, np.nan)
+            self.skipped_predictions = 0
             self.last_prediction_time = 0
             self.fall_detected = False
             self.fall_count = 0
+            # Reused 1x5 feature row (same column order as training) - avoids
+            # building a DataFrame per prediction
+            self._feature_buf = np.empty((1, 5), dtype=np.float32)
             
             print("✅ Fall detection model loaded successfully!")
         except Exception as e:
@@ -26,19 +45,18 @@ class RealTimeFallDetector:
             
     def extract_features(self, sensor_data):
         """Extract features matching training data"""
-        accel_magnitude = np.sqrt(sensor_data['ax']**2 + sensor_data['ay']**2 + sensor_data['az']**2)
-        gyro_magnitude = np.sqrt(sensor_data['gx']**2 + sensor_data['gy']**2 + sensor_data['gz']**2)
-        vertical_deviation = abs(sensor_data['az'] - 1.0)
-        
-        if len(self.data_buffer) > 0:
-            prev_data = self.data_buffer[-1]
-            prev_accel_mag = np.sqrt(prev_data['ax']**2 + prev_data['ay']**2 + prev_data['az']**2)
-            prev_gyro_mag = np.sqrt(prev_data['gx']**2 + prev_data['gy']**2 + prev_data['gz']**2)
-            accel_change = accel_magnitude - prev_accel_mag
-            gyro_change = gyro_magnitude - prev_gyro_mag
-        else:
-            accel_change = 0
-            gyro_change = 0
+        return self._extract(sensor_data['ax'], sensor_data['ay'], sensor_data['az'],
+                             sensor_data['gx'], sensor_data['gy'], sensor_data['gz'])
+    
+    def _extract(self, ax, ay, az, gx, gy, gz):
+        """Feature dict for one reading, in training column order"""
+        has_prev = self._i > 0
+        prev = (self._i - 1) % HISTORY_SIZE
+        
+        (accel_magnitude, gyro_magnitude, accel_change,
+         gyro_change, vertical_deviation) = fall_features(
+            ax, ay, az, gx, gy, gz,
+            self._mag_acc[prev], self._mag_gyr[prev], has_prev)
         
         return {
             'accel_magnitude': accel_magnitude,
@@ -48,53 +66,115 @@ class RealTimeFallDetector:
             'vertical_deviation': vertical_deviation
         }
     
+    def _push_reading(self, accel_magnitude, gyro_magnitude):
+        """Store a reading's magnitudes in the history ring buffers"""
+        i = self._i % HISTORY_SIZE
+        self._mag_acc[i] = accel_magnitude
+        self._mag_gyr[i] = gyro_magnitude
+        self._i += 1
+    
     def predict_fall(self, sensor_data):
         """Predict fall with proper feature array"""
+        return self._predict(sensor_data['ax'], sensor_data['ay'], sensor_data['az'],
+                             sensor_data['gx'], sensor_data['gy'], sensor_data['gz'])
+    
+    def predict_fall_vec(self, vec):
+        """Predict fall from a length-6 (ax, ay, az, gx, gy, gz) array"""
+        ax, ay, az, gx, gy, gz = vec.tolist()
+        return self._predict(ax, ay, az, gx, gy, gz)
+    
+    def _observe(self, ax, ay, az, gx, gy, gz):
+        """Extract features for a reading, record it, and report whether the
+        device is at rest (the still gate)"""
+        features = self._extract(ax, ay, az, gx, gy, gz)
+        self._push_reading(features['accel_magnitude'], features['gyro_magnitude'])
+        
+        # Device at rest: the model only flags transient high-magnitude events,
+        # so callers report no fall without running it
+        accel_magnitude = features['accel_magnitude']
+        mags = self._still_mags
+        mags[self._i % STILL_WINDOW] = accel_magnitude
+        still = (abs(accel_magnitude - 1.0) < STILL_TOLERANCE
+                 and mags.max() - mags.min() < STILL_RANGE)
+        return features, still
+    
+    def _predict(self, ax, ay, az, gx, gy, gz):
+        """Shared prediction path for dict and vector readings"""
         if self.model is None:
             return {'fall_detected': False, 'confidence': 0.0, 'features': {}}
             
-        features = self.extract_features(sensor_data)
-        self.data_buffer.append(sensor_data)
-        
-        # Create feature DataFrame with proper column names (like training)
-        feature_df = pd.DataFrame([features])
-        
-        try:
-            prediction = self.model.predict(feature_df)[0]
-            probability = self.model.predict_proba(feature_df)[0]
-            confidence = max(probability)
-            
+        features, still = self._observe(ax, ay, az, gx, gy, gz)
+        if still:
+            self.skipped_predictions += 1
             return {
-                'fall_detected': bool(prediction),
-                'confidence': confidence,
-                'features': features,
-                'timestamp': time.time()
-            }
-        except Exception as e:
-            # Fallback to array method if DataFrame fails
-            feature_array = np.array([[
-                features['accel_magnitude'],
-                features['gyro_magnitude'], 
-                features['accel_change'],
-                features['gyro_change'],
-                features['vertical_deviation']
-            ]])
-            
-            prediction = self.model.predict(feature_array)[0]
-            probability = self.model.predict_proba(feature_array)[0]
-            confidence = max(probability)
-            
-            return {
-                'fall_detected': bool(prediction),
-                'confidence': confidence,
+                'fall_detected': False,
+                'confidence': 1.0,
                 'features': features,
                 'timestamp': time.time()
             }
+        
+        buf = self._feature_buf
+        row = buf[0]
+        row[0] = features['accel_magnitude']
+        row[1] = features['gyro_magnitude']
+        row[2] = features['accel_change']
+        row[3] = features['gyro_change']
+        row[4] = features['vertical_deviation']
+        
+        prediction = self.model.predict(buf)[0]
+        # predict_proba walks every tree again and its value only gates
+        # positive predictions, so skip it for the common no-fall case
+        confidence = 1.0
+        if prediction:
+            confidence = float(self.model.predict_proba(buf)[0].max())
+        
+        return {
+            'fall_detected': bool(prediction),
+            'confidence': confidence,
+            'features': features,
+            'timestamp': time.time()
+        }
+    
+    def predict_fall_batch(self, sensor_rows):
+        """Predict falls for an (N, 6) array of ax, ay, az, gx, gy, gz rows at once
+        (offline/CSV replay). Rows are treated as one consecutive recording, so
+        the first row has no change features; detector state is not touched."""
+        if self.model is None:
+            n = len(sensor_rows)
+            return {'fall_detected': np.zeros(n, dtype=bool), 'confidence': np.zeros(n), 'features': None}
+        
+        rows = np.asarray(sensor_rows, dtype=np.float32)
+        accel, gyro = rows[:, :3], rows[:, 3:6]
+        
+        # Same columns as extract_features, computed for every row in one pass
+        features = np.empty((len(rows), 5), dtype=np.float32)
+        features[:, 0] = np.sqrt(np.einsum('ij,ij->i', accel, accel))
+        features[:, 1] = np.sqrt(np.einsum('ij,ij->i', gyro, gyro))
+        features[:, 2] = np.diff(features[:, 0], prepend=features[:1, 0])
+        features[:, 3] = np.diff(features[:, 1], prepend=features[:1, 1])
+        features[:, 4] = np.abs(rows[:, 2] - 1.0)
+        
+        predictions = self.model.predict(features).astype(bool)
+        confidence = np.ones(len(rows))
+        if predictions.any():
+            confidence[predictions] = self.model.predict_proba(features[predictions]).max(axis=1)
+        
+        return {
+            'fall_detected': predictions,
+            'confidence': confidence,
+            'features': features
+        }
     
     def process_sensor_reading(self, sensor_data):
         """Process sensor reading with reduced false alarms"""
-        result = self.predict_fall(sensor_data)
-        
+        return self._update_alert(self.predict_fall(sensor_data))
+    
+    def process_vec(self, vec):
+        """Same as process_sensor_reading, for a preallocated (ax, ay, az, gx, gy, gz) array"""
+        return self._update_alert(self.predict_fall_vec(vec))
+    
+    def _update_alert(self, result):
+        """Apply the confidence gate and alert hold-off to a prediction"""
         # Only alert on high confidence falls
         if result['fall_detected'] and result['confidence'] > 0.8:
             if not self.fall_detected:
@@ -118,3 +198,80 @@ class RealTimeFallDetector:
         print(f"   Gyro: {result['features']['gyro_magnitude']:.1f}°/s")
         print(f"   Time: {time.strftime('%H:%M:%S')}")
         print("🚨" * 15 + "\n")
+
+class StridedFallDetector:
+    """Wraps a RealTimeFallDetector and runs its model once every `stride`
+    readings on the batch of their feature rows, instead of once per reading"""
+    
+    def __init__(self, detector, stride=5):
+        self.detector = detector
+        self.stride = stride
+        self._rows = np.empty((stride, 5), dtype=np.float32)
+        self._features = [None] * stride
+        self._still = np.zeros(stride, dtype=bool)
+        self._n = 0
+    
+    def process_vec(self, vec):
+        """Like RealTimeFallDetector.process_vec; readings inside a stride return
+        a pending no-fall result and the last one returns the batch verdict.
+        The verdict's 'lag' is how many readings before this one the reported
+        fall happened (0 = this reading), and its features are that reading's"""
+        detector = self.detector
+        if detector.model is None:
+            return detector.process_vec(vec)
+        
+        ax, ay, az, gx, gy, gz = vec.tolist()
+        features, still = detector._observe(ax, ay, az, gx, gy, gz)
+        
+        i = self._n
+        row = self._rows[i]
+        row[0] = features['accel_magnitude']
+        row[1] = features['gyro_magnitude']
+        row[2] = features['accel_change']
+        row[3] = features['gyro_change']
+        row[4] = features['vertical_deviation']
+        self._features[i] = features
+        self._still[i] = still
+        self._n += 1
+        
+        if self._n < self.stride:
+            return {
+                'fall_detected': False,
+                'confidence': 1.0,
+                'features': features,
+                'timestamp': time.time(),
+                'pending': True
+            }
+        
+        self._n = 0
+        return detector._update_alert(self._predict_block(features))
+    
+    def _predict_block(self, latest_features):
+        """One model call for the buffered rows; reports the most confident fall"""
+        detector = self.detector
+        result = {
+            'fall_detected': False,
+            'confidence': 1.0,
+            'features': latest_features,
+            'timestamp': time.time(),
+            'lag': 0
+        }
+        
+        active = np.flatnonzero(~self._still)
+        detector.skipped_predictions += self.stride - len(active)
+        if len(active) == 0:
+            return result
+        
+        rows = self._rows[active]
+        predictions = detector.model.predict(rows).astype(bool)
+        if predictions.any():
+            positive = np.flatnonzero(predictions)
+            confidence = detector.model.predict_proba(rows[positive]).max(axis=1)
+            k = int(confidence.argmax())
+            result['fall_detected'] = True
+            result['confidence'] = float(confidence[k])
+            i = int(active[positive[k]])
+            result['features'] = self._features[i]
+            result['lag'] = self.stride - 1 - i
+        
+        return result
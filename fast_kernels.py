@@ -0,0 +1,27 @@
+# fast_kernels.py - Small numeric kernels shared by the sampling loop and fall detector
+import math
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional - fall back to plain Python kernels
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+@njit(cache=True, fastmath=True)
+def imu_mags(ax, ay, az, gx, gy, gz):
+    """Accelerometer and gyroscope vector magnitudes"""
+    return math.sqrt(ax * ax + ay * ay + az * az), math.sqrt(gx * gx + gy * gy + gz * gz)
+
+@njit(cache=True, fastmath=True)
+def fall_features(ax, ay, az, gx, gy, gz, prev_accel_mag, prev_gyro_mag, has_prev):
+    """Compute the 5 fall model features from the current sample and previous magnitudes"""
+    accel_magnitude = math.sqrt(ax * ax + ay * ay + az * az)
+    gyro_magnitude = math.sqrt(gx * gx + gy * gy + gz * gz)
+    # With no previous reading the change features are 0
+    accel_change = accel_magnitude - prev_accel_mag if has_prev else 0.0
+    gyro_change = gyro_magnitude - prev_gyro_mag if has_prev else 0.0
+    return (accel_magnitude, gyro_magnitude, accel_change, gyro_change,
+            abs(az - 1.0))
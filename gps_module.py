@@ -1,12 +1,54 @@
 # gps_module.py - GPS functionality for emergency alerts
+import asyncio
 import serial
-import pynmea2
 import threading
 import time
 import json
 from datetime import datetime
 import requests
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# pyserial-asyncio is optional - without it GPS falls back to a blocking reader thread
+try:
+    import serial_asyncio
+except ImportError:
+    serial_asyncio = None
+
+EMERGENCY_LOG_FILE = 'emergency_log.json'
+
+def _dumps_log_entry(entry):
+    """Serialize one emergency log entry as a newline-terminated JSON line"""
+    if orjson is not None:
+        return orjson.dumps(entry, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE, default=str)
+    return (json.dumps(entry, default=str) + '\n').encode('utf-8')
+
+def _split_nmea(sentence):
+    """Validate the *hh checksum (if present) and split a sentence into fields"""
+    star = sentence.rfind('*')
+    if star == -1:
+        return sentence.split(',')
+    
+    checksum = 0
+    for b in sentence[1:star].encode('ascii'):
+        checksum ^= b
+    if sentence[star + 1:star + 3].upper() != f"{checksum:02X}":
+        raise ValueError(f"checksum mismatch in {sentence!r}")
+    return sentence[:star].split(',')
+
+def _nmea_to_deg(value, hemisphere):
+    """Convert an NMEA ddmm.mmmm / dddmm.mmmm field to signed decimal degrees"""
+    if not value:
+        return None
+    # Minutes always start two characters before the decimal point
+    dot = value.find('.')
+    split = (dot if dot >= 0 else len(value)) - 2
+    decimal = int(value[:split]) + float(value[split:]) / 60.0
+    return -decimal if hemisphere in ('S', 'W') else decimal
+
 class GPSTracker:
     def __init__(self, serial_port='/dev/ttyS0', baud_rate=9600):
         """Initialize GPS tracker"""
@@ -28,11 +70,23 @@ class GPSTracker:
             'gps_status': 'initializing'
         }
         
-        # Thread for GPS reading
+        # Thread for GPS reading (runs the event loop when asyncio is used)
         self.gps_thread = None
+        self.loop = None
+        self._reader_task = None
+        self._writer = None
+        
+        # Sentence type (talker ID stripped) -> parser
+        self._handlers = {
+            'GGA': self._parse_gga,  # Global Positioning System Fix Data
+            'RMC': self._parse_rmc   # Recommended Minimum Course
+        }
         
     def start(self):
         """Start GPS tracking"""
+        if serial_asyncio is not None:
+            return self._start_async()
+        
         try:
             self.ser = serial.Serial(self.serial_port, self.baud_rate, timeout=1)
             self.running = True
@@ -49,54 +103,126 @@ class GPSTracker:
             print(f"❌ Failed to start GPS: {e}")
             return False
     
+    def _start_async(self):
+        """Start the NMEA reader as a task on a background event loop"""
+        self.loop = asyncio.new_event_loop()
+        self.gps_thread = threading.Thread(target=self.loop.run_forever)
+        self.gps_thread.daemon = True
+        self.gps_thread.start()
+        
+        try:
+            self.running = True
+            asyncio.run_coroutine_threadsafe(self._open_async(), self.loop).result(timeout=5)
+            print("📡 GPS Tracker started successfully (asyncio)")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Failed to start GPS: {e}")
+            self.running = False
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop = None
+            return False
+    
+    async def _open_async(self):
+        reader, self._writer = await serial_asyncio.open_serial_connection(
+            url=self.serial_port, baudrate=self.baud_rate)
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_gps_async(reader))
+    
+    async def _close_async(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self._writer:
+            self._writer.close()
+    
+    def submit(self, coro):
+        """Schedule a coroutine (e.g. alert delivery) on the GPS event loop so it
+        runs without blocking the caller or the NMEA reader"""
+        if self.loop is None:
+            # No event loop (pyserial-asyncio missing or GPS not started)
+            threading.Thread(target=asyncio.run, args=(coro,), daemon=True).start()
+            return None
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
     def stop(self):
         """Stop GPS tracking"""
         self.running = False
+        if self.loop:
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_async(), self.loop).result(timeout=2)
+            except Exception as e:
+                print(f"⚠️ GPS shutdown: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop = None
         if self.ser:
             self.ser.close()
         print("📡 GPS Tracker stopped")
     
+    def _dispatch_sentence(self, line):
+        """Route one NMEA sentence to its parser"""
+        # '$GPGGA,...' -> 'GGA'; any talker (GP, GN, ...) is accepted
+        handler = self._handlers.get(line[3:6]) if line[:1] == '$' else None
+        if handler:
+            handler(line)
+    
+    async def _read_gps_async(self, reader):
+        """Event-loop task to read GPS data"""
+        print("📡 Starting GPS data reading...")
+        
+        while self.running:
+            try:
+                # Resumes as soon as a full sentence has arrived
+                raw = await reader.readline()
+                if not raw and reader.at_eof():
+                    # Port went away (e.g. GPS unplugged) - readline() would return b'' forever
+                    print("❌ GPS serial port closed, stopping GPS reader")
+                    break
+                line = raw.decode('ascii', errors='ignore').strip()
+                if line:
+                    self._dispatch_sentence(line)
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"❌ GPS reading error: {e}")
+                await asyncio.sleep(1)
+    
     def _read_gps_data(self):
         """Background thread to read GPS data"""
         print("📡 Starting GPS data reading...")
         
         while self.running:
             try:
-                if self.ser and self.ser.in_waiting > 0:
-                    line = self.ser.readline().decode('utf-8', errors='ignore').strip()
-                    
-                    if line.startswith('$GPGGA') or line.startswith('$GNGGA'):
-                        # Global Positioning System Fix Data
-                        self._parse_gga(line)
-                    elif line.startswith('$GPRMC') or line.startswith('$GNRMC'):
-                        # Recommended Minimum Course
-                        self._parse_rmc(line)
-                        
-                time.sleep(0.1)  # Small delay to prevent CPU overload
+                # Blocks until a full sentence arrives (or the 1 s serial timeout)
+                line = self.ser.readline().decode('ascii', errors='ignore').strip()
+                if line:
+                    self._dispatch_sentence(line)
                 
             except Exception as e:
+                if not self.running:
+                    break  # Port was closed by stop() while readline() was blocked
                 print(f"❌ GPS reading error: {e}")
                 time.sleep(1)
     
     def _parse_gga(self, sentence):
         """Parse GPGGA sentence"""
         try:
-            msg = pynmea2.parse(sentence)
+            fields = _split_nmea(sentence)
             
-            self.current_location.update({
-                'latitude': float(msg.latitude) if msg.latitude else None,
-                'longitude': float(msg.longitude) if msg.longitude else None,
-                'altitude': float(msg.altitude) if msg.altitude else None,
-                'fix_quality': int(msg.gps_qual) if msg.gps_qual else 0,
-                'satellites': int(msg.num_sats) if msg.num_sats else 0,
-                'timestamp': datetime.now().isoformat()
-            })
+            fix_quality = int(fields[6]) if fields[6] else 0
             
-            # Update GPS status
-            if self.current_location['fix_quality'] > 0:
-                self.current_location['gps_status'] = 'fixed'
-            else:
-                self.current_location['gps_status'] = 'searching'
+            # Build a new snapshot and swap it in with one assignment, so
+            # readers on other threads never see a half-updated fix
+            location = dict(self.current_location)
+            location.update({
+                'latitude': _nmea_to_deg(fields[2], fields[3]),
+                'longitude': _nmea_to_deg(fields[4], fields[5]),
+                'altitude': float(fields[9]) if fields[9] else None,
+                'fix_quality': fix_quality,
+                'satellites': int(fields[7]) if fields[7] else 0,
+                'timestamp': datetime.now().isoformat(),
+                'gps_status': 'fixed' if fix_quality > 0 else 'searching'
+            })
+            self.current_location = location
                 
         except Exception as e:
             print(f"❌ Error parsing GGA: {e}")
@@ -104,12 +230,16 @@ class GPSTracker:
     def _parse_rmc(self, sentence):
         """Parse GPRMC sentence"""
         try:
-            msg = pynmea2.parse(sentence)
+            fields = _split_nmea(sentence)
+            speed, course = fields[7], fields[8]
             
-            if msg.speed:
-                self.current_location['speed'] = float(msg.speed) * 1.852  # Convert knots to km/h
-            if msg.true_course:
-                self.current_location['course'] = float(msg.true_course)
+            if speed or course:
+                location = dict(self.current_location)
+                if speed:
+                    location['speed'] = float(speed) * 1.852  # Convert knots to km/h
+                if course:
+                    location['course'] = float(course)
+                self.current_location = location
                 
         except Exception as e:
             print(f"❌ Error parsing RMC: {e}")
@@ -120,24 +250,27 @@ class GPSTracker:
     
     def is_location_valid(self):
         """Check if GPS has valid location"""
-        return (self.current_location['latitude'] is not None and 
-                self.current_location['longitude'] is not None and
-                self.current_location['fix_quality'] > 0)
+        return self._is_valid(self.current_location)
+    
+    @staticmethod
+    def _is_valid(location):
+        """Check a location snapshot for a usable fix"""
+        return (location['latitude'] is not None and 
+                location['longitude'] is not None and
+                location['fix_quality'] > 0)
     
     def get_google_maps_link(self):
         """Generate Google Maps link for current location"""
-        if self.is_location_valid():
-            lat = self.current_location['latitude']
-            lon = self.current_location['longitude']
-            return f"https://maps.google.com/maps?q={lat},{lon}"
+        location = self.current_location  # one consistent snapshot
+        if self._is_valid(location):
+            return f"https://maps.google.com/maps?q={location['latitude']},{location['longitude']}"
         return None
     
     def get_location_string(self):
         """Get human-readable location string"""
-        if self.is_location_valid():
-            lat = self.current_location['latitude']
-            lon = self.current_location['longitude']
-            return f"Lat: {lat:.6f}, Lon: {lon:.6f}"
+        location = self.current_location  # one consistent snapshot
+        if self._is_valid(location):
+            return f"Lat: {location['latitude']:.6f}, Lon: {location['longitude']:.6f}"
         return "Location not available"
 
 # Emergency Alert System
@@ -150,6 +283,13 @@ class EmergencyAlertSystem:
             "+0987654321"
         ]
         
+        # Keep the log open so a fall doesn't pay for an open() on the alert path
+        try:
+            self._log_file = open(EMERGENCY_LOG_FILE, 'ab', buffering=0)
+        except Exception as e:
+            print(f"⚠️ Emergency log unavailable: {e}")
+            self._log_file = None
+        
     def send_fall_alert(self, fall_data):
         """Send emergency alert when fall is detected"""
         location = self.gps_tracker.get_location()
@@ -159,7 +299,8 @@ class EmergencyAlertSystem:
         
         # Send alerts through multiple channels
         self._send_console_alert(alert_message)
-        # self._send_sms_alert(alert_message)  # Uncomment when SMS service is configured
+        # Delivered on the GPS event loop so network I/O never stalls sensor reads
+        # self.gps_tracker.submit(self._send_sms_alert(alert_message))  # Uncomment when SMS service is configured
         self._save_emergency_log(fall_data, location)
         
         return alert_message
@@ -203,10 +344,11 @@ GPS Status: {location.get('gps_status', 'unknown')}
         print(message)
         print("="*60)
     
-    def _send_sms_alert(self, message):
+    async def _send_sms_alert(self, message):
         """Send SMS alert (requires SMS service configuration)"""
-        # Example using Twilio (requires account setup)
-        # from twilio.rest import Client
+        # Example using an HTTP SMS gateway (requires account setup), e.g.
+        # async with aiohttp.ClientSession() as session:
+        #     await session.post(SMS_GATEWAY_URL, data={...})
         
         # Replace with your SMS service implementation
         print("📱 SMS Alert would be sent to:", self.emergency_contacts)
@@ -222,8 +364,9 @@ GPS Status: {location.get('gps_status', 'unknown')}
         }
         
         try:
-            with open('emergency_log.json', 'a') as f:
-                f.write(json.dumps(log_entry) + '\n')
+            if self._log_file is None:
+                raise OSError(f"{EMERGENCY_LOG_FILE} is not open")
+            self._log_file.write(_dumps_log_entry(log_entry))
             print("📝 Emergency event logged")
         except Exception as e:
             print(f"❌ Failed to log emergency: {e}")
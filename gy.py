@@ -4,6 +4,7 @@ import struct
 import smbus2 as smbus
 from max30102.max30102 import MAX30102
 from max30102.heartrate_monitor import HeartRateMonitor
+from sensors.imu import IMU_STRUCT, ACCEL_SCALE, GYRO_SCALE, TEMP_SCALE, TEMP_OFFSET
 
 # I2C bus
 bus = smbus.SMBus(1)
@@ -17,6 +18,11 @@ PWR_MGMT_1 = 0x6B
 ACCEL_XOUT_H = 0x3B
 USER_CTRL = 0x6A
 INT_PIN_CFG = 0x37
+I2C_MST_CTRL = 0x24
+I2C_SLV0_ADDR = 0x25
+I2C_SLV0_REG = 0x26
+I2C_SLV0_CTRL = 0x27
+EXT_SENS_DATA_00 = 0x49  # Directly follows GYRO_ZOUT_L (0x48)
 
 # AK8963 registers
 AK8963_CNTL1 = 0x0A
@@ -24,6 +30,15 @@ AK8963_ST1 = 0x02
 AK8963_XOUT_L = 0x03
 AK8963_ST2 = 0x09
 
+# AK8963 magnetometer XYZ as little-endian int16, 0.15 µT per LSB
+_MAG_STRUCT = struct.Struct('<3h')
+_MAG_SCALE = 0.15
+
+# AK8963 HXL..HZH + ST2, mirrored by the MPU9250 I2C master into EXT_SENS_DATA
+MAG_BLOCK_LEN = 7
+# Accel/temp/gyro (14 bytes) followed by the mirrored magnetometer block
+IMU_MAG_BLOCK_LEN = 14 + MAG_BLOCK_LEN
+
 class MPU9250_9Axis:
     def __init__(self):
         self.setup_mpu9250()
@@ -61,6 +76,7 @@ class MPU9250_9Axis:
                 bus.write_byte_data(AK8963_ADDR, AK8963_CNTL1, 0x16)
                 time.sleep(0.01)
                 
+                self.setup_mag_passthrough()
                 self.mag_available = True
             else:
                 print(f"AK8963 not found. WHO_AM_I: 0x{who_am_i:02X}")
@@ -70,29 +86,48 @@ class MPU9250_9Axis:
             print(f"Magnetometer setup failed: {e}")
             self.mag_available = False
     
+    def setup_mag_passthrough(self):
+        """Let the MPU9250's I2C master poll the AK8963 so all 9 axes are
+        contiguous from ACCEL_XOUT_H and can be read in one transaction"""
+        # Leave bypass mode and enable the internal I2C master at 400kHz
+        bus.write_byte_data(MPU9250_ADDR, INT_PIN_CFG, 0x00)
+        bus.write_byte_data(MPU9250_ADDR, I2C_MST_CTRL, 0x0D)
+        bus.write_byte_data(MPU9250_ADDR, USER_CTRL, 0x20)
+        time.sleep(0.01)
+        
+        # SLV0: read HXL..ST2 from the AK8963 every sample (reading ST2
+        # also releases the next measurement)
+        bus.write_byte_data(MPU9250_ADDR, I2C_SLV0_ADDR, 0x80 | AK8963_ADDR)
+        bus.write_byte_data(MPU9250_ADDR, I2C_SLV0_REG, AK8963_XOUT_L)
+        bus.write_byte_data(MPU9250_ADDR, I2C_SLV0_CTRL, 0x80 | MAG_BLOCK_LEN)
+        time.sleep(0.01)
+    
     def read_accel_gyro(self):
-        """Read accelerometer and gyroscope data"""
+        """Read accelerometer, gyroscope and (when available) magnetometer data"""
         if not self.mpu_available:
             return None
             
         try:
-            raw_data = bus.read_i2c_block_data(MPU9250_ADDR, ACCEL_XOUT_H, 14)
+            # With the magnetometer mirrored into EXT_SENS_DATA, a single
+            # block read returns all 9 axes
+            length = IMU_MAG_BLOCK_LEN if self.mag_available else 14
+            raw_data = bytes(bus.read_i2c_block_data(MPU9250_ADDR, ACCEL_XOUT_H, length))
             
             # Convert to signed 16-bit values
-            accel_x = struct.unpack('>h', bytes(raw_data[0:2]))[0] / 16384.0
-            accel_y = struct.unpack('>h', bytes(raw_data[2:4]))[0] / 16384.0
-            accel_z = struct.unpack('>h', bytes(raw_data[4:6]))[0] / 16384.0
-            
-            temp = struct.unpack('>h', bytes(raw_data[6:8]))[0] / 340.0 + 36.53
+            ax, ay, az, t, gx, gy, gz = IMU_STRUCT.unpack_from(raw_data)
             
-            gyro_x = struct.unpack('>h', bytes(raw_data[8:10]))[0] / 131.0
-            gyro_y = struct.unpack('>h', bytes(raw_data[10:12]))[0] / 131.0
-            gyro_z = struct.unpack('>h', bytes(raw_data[12:14]))[0] / 131.0
+            if self.mag_available:
+                # Little endian for AK8963
+                mag_x, mag_y, mag_z = _MAG_STRUCT.unpack_from(raw_data, 14)
+                mag = {'x': mag_x * _MAG_SCALE, 'y': mag_y * _MAG_SCALE, 'z': mag_z * _MAG_SCALE}
+            else:
+                mag = {'x': None, 'y': None, 'z': None}
             
             return {
-                'accel': {'x': accel_x, 'y': accel_y, 'z': accel_z},
-                'gyro': {'x': gyro_x, 'y': gyro_y, 'z': gyro_z},
-                'temp': temp
+                'accel': {'x': ax * ACCEL_SCALE, 'y': ay * ACCEL_SCALE, 'z': az * ACCEL_SCALE},
+                'gyro': {'x': gx * GYRO_SCALE, 'y': gy * GYRO_SCALE, 'z': gz * GYRO_SCALE},
+                'temp': t * TEMP_SCALE + TEMP_OFFSET,
+                'mag': mag
             }
         except Exception as e:
             print(f"IMU read error: {e}")
@@ -104,21 +139,13 @@ class MPU9250_9Axis:
             return {'x': None, 'y': None, 'z': None}
             
         try:
-            # Check if data is ready
-            status = bus.read_byte_data(AK8963_ADDR, AK8963_ST1)
-            if status & 0x01:  # Data ready bit
-                # Read 6 bytes of magnetometer data
-                mag_data = bus.read_i2c_block_data(AK8963_ADDR, AK8963_XOUT_L, 6)
-                
-                # Convert to signed 16-bit values (little endian for AK8963)
-                mag_x = struct.unpack('<h', bytes(mag_data[0:2]))[0] * 0.15
-                mag_y = struct.unpack('<h', bytes(mag_data[2:4]))[0] * 0.15  
-                mag_z = struct.unpack('<h', bytes(mag_data[4:6]))[0] * 0.15
-                
-                # Read ST2 to complete measurement
-                bus.read_byte_data(AK8963_ADDR, AK8963_ST2)
-                
-                return {'x': mag_x, 'y': mag_y, 'z': mag_z}
+            # Latest AK8963 sample as mirrored by the MPU9250 I2C master
+            mag_data = bus.read_i2c_block_data(MPU9250_ADDR, EXT_SENS_DATA_00, MAG_BLOCK_LEN)
+            
+            # Convert to signed 16-bit values (little endian for AK8963)
+            mag_x, mag_y, mag_z = _MAG_STRUCT.unpack_from(bytes(mag_data))
+            
+            return {'x': mag_x * _MAG_SCALE, 'y': mag_y * _MAG_SCALE, 'z': mag_z * _MAG_SCALE}
                 
         except Exception as e:
             print(f"Magnetometer read error: {e}")
@@ -142,19 +169,19 @@ def read_all_sensors():
         while True:
             timestamp = time.time()
             
-            # Read all 9-axis data
+            # Read all 9-axis data in one I2C transaction
             imu_data = mpu9250.read_accel_gyro()
-            mag_data = mpu9250.read_magnetometer()
             
             # Get heart rate and SpO2
-            bpm = hr_monitor.bpm if hasattr(hr_monitor, 'bpm') else 0
-            spo2 = hr_monitor.spo2 if hasattr(hr_monitor, 'spo2') else None
+            bpm = hr_monitor.bpm
+            spo2 = hr_monitor.spo2
             
             if imu_data:
                 print(f"[{time.strftime('%H:%M:%S', time.localtime(timestamp))}]")
                 print(f"Accel: X={imu_data['accel']['x']:.3f}g Y={imu_data['accel']['y']:.3f}g Z={imu_data['accel']['z']:.3f}g")
                 print(f"Gyro:  X={imu_data['gyro']['x']:.1f}°/s Y={imu_data['gyro']['y']:.1f}°/s Z={imu_data['gyro']['z']:.1f}°/s")
                 
+                mag_data = imu_data['mag']
                 if mag_data['x'] is not None:
                     print(f"Mag:   X={mag_data['x']:.1f}µT Y={mag_data['y']:.1f}µT Z={mag_data['z']:.1f}µT")
                 else:
@@ -1,11 +1,14 @@
+import os
 import time
-import csv
-import struct
+import queue
+import numpy as np
 import smbus2 as smbus
 from datetime import datetime
 from max30102.max30102 import MAX30102
 from max30102.heartrate_monitor import HeartRateMonitor
 from gps_module import GPSTracker, EmergencyAlertSystem
+from fast_kernels import imu_mags
+from sensors.imu import IMU6Axis
 import fcntl
 import threading
 import warnings
@@ -15,84 +18,175 @@ warnings.filterwarnings('ignore', category=UserWarning, module='sklearn')
 
 # Try to import fall detector (with error handling)
 try:
-    from fall_detector import RealTimeFallDetector
+    from fall_detector import RealTimeFallDetector, StridedFallDetector
     FALL_DETECTION_ENABLED = True
 except ImportError as e:
     print(f"⚠️  Fall detection not available: {e}")
     FALL_DETECTION_ENABLED = False
 
-# I2C bus and addresses
+# I2C bus, shared by the IMU and other I2C users under i2c_lock
 bus = smbus.SMBus(1)
-MPU9250_ADDR = 0x68
 
-# MPU9250 registers (6-axis only)
-PWR_MGMT_1 = 0x6B
-ACCEL_XOUT_H = 0x3B
+# Sampling period of the logging loop (10 Hz)
+SAMPLE_PERIOD = 0.1
+
+# Samples per fall-model call (5 = at most 0.5 s extra detection latency)
+FALL_STRIDE = 5
+
+# Seconds between CSV flush + fsync (rows are buffered in between)
+CSV_FLUSH_INTERVAL = 1.0
+
+# Positions of columns read back from a queued row tuple
+CSV_DATETIME_COL = 1
+CSV_TEMP_COL = 8
+CSV_BPM_COL = 9
+CSV_FALL_PREDICTED_COL = 12
+CSV_FALL_CONFIDENCE_COL = 13
+
+# Confidence logged for a stride reading that is not the reported fall
+# (the value the detector gives its pending no-fall readings)
+NO_FALL_CONFIDENCE = 1.0
+
+# CSV columns, including fall detection
+CSV_FIELDNAMES = [
+    'timestamp', 'datetime',
+    'ax', 'ay', 'az',           # Accelerometer (g)
+    'gx', 'gy', 'gz',           # Gyroscope (°/s)
+    'temp',                     # Temperature (°C)
+    'bpm', 'spo2',              # Vital signs
+    'finger_detected',          # Status flag
+    'fall_predicted',           # Fall prediction (0/1)
+    'fall_confidence',          # Confidence score
+    'accel_magnitude',          # Feature for analysis
+    'gyro_magnitude'            # Feature for analysis
+]
+# One sample per record, fields in CSV_FIELDNAMES order (spo2 is NaN when absent)
+CSV_RECORD_DTYPE = np.dtype([
+    ('timestamp', 'f8'), ('datetime', 'U23'),
+    ('ax', 'f4'), ('ay', 'f4'), ('az', 'f4'),
+    ('gx', 'f4'), ('gy', 'f4'), ('gz', 'f4'),
+    ('temp', 'f4'),
+    ('bpm', 'f8'), ('spo2', 'f8'),
+    ('finger_detected', '?'),
+    ('fall_predicted', '?'),
+    ('fall_confidence', 'f4'),
+    ('accel_magnitude', 'f4'),
+    ('gyro_magnitude', 'f4')
+])
+# Samples per record block handed to the writer thread (1 s at 10 Hz)
+CSV_BLOCK_SIZE = 10
+# Blocks buffered between the sampling loop and the CSV writer thread
+CSV_QUEUE_SIZE = 256
+# Max blocks the writer formats and writes in one go
+CSV_WRITE_BATCH = 8
 
 # I2C lock for thread safety
 i2c_lock = threading.Lock()
 
-class IMU6Axis:
-    def __init__(self):
-        self.setup_mpu()
-        
-    def setup_mpu(self):
-        """Initialize MPU9250 for 6-axis readings only"""
+def _format_csv_row(row):
+    """Format one logged sample tuple as an encoded CSV line"""
+    (t, datetime_str, ax, ay, az, gx, gy, gz, temp, bpm, spo2,
+     finger_detected, fall_predicted, fall_confidence, accel_magnitude, gyro_magnitude) = row
+    return (f"{t:.3f},{datetime_str},"
+            f"{ax:.4f},{ay:.4f},{az:.4f},"
+            f"{gx:.4f},{gy:.4f},{gz:.4f},"
+            f"{temp:.2f},"
+            f"{bpm:g},{'' if spo2 != spo2 else f'{spo2:g}'},"
+            f"{finger_detected},{fall_predicted},"
+            f"{fall_confidence:.3f},{accel_magnitude:.3f},{gyro_magnitude:.3f}\n").encode('ascii')
+
+class CSVWriter:
+    """Collects samples into structured record blocks; a background thread
+    formats full blocks and writes them to disk"""
+
+    def __init__(self, filename, fieldnames):
+        # Binary file with a 64 KiB buffer: rows are ASCII-only and need no
+        # quoting, so they are formatted and encoded once, skipping csv + text IO
+        self._file = open(filename, 'wb', buffering=1 << 16)
+        self._file.write((','.join(fieldnames) + '\n').encode('ascii'))
+        self._queue = queue.Queue(CSV_QUEUE_SIZE)
+        self._block = np.empty(CSV_BLOCK_SIZE, dtype=CSV_RECORD_DTYPE)
+        self._n = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, row):
+        """Store a sample tuple in the current block, handing the block off once full"""
+        self._block[self._n] = row
+        self._n += 1
+        if self._n == CSV_BLOCK_SIZE:
+            self._put_block(self._block)
+            self._block = np.empty(CSV_BLOCK_SIZE, dtype=CSV_RECORD_DTYPE)
+            self._n = 0
+
+    def _put_block(self, block):
+        """Queue a block without blocking, dropping the oldest one if the writer is behind"""
         try:
-            with i2c_lock:
-                bus.write_byte_data(MPU9250_ADDR, PWR_MGMT_1, 0x00)
-                time.sleep(0.1)
-            print("✅ 6-axis IMU initialized successfully")
-            self.available = True
-        except Exception as e:
-            print(f"❌ IMU initialization failed: {e}")
-            self.available = False
-    
-    def read_data(self):
-        """Read accelerometer and gyroscope data with I2C protection"""
-        if not self.available:
-            return None
-            
-        max_retries = 3
-        for attempt in range(max_retries):
+            self._queue.put_nowait(block)
+        except queue.Full:
             try:
-                with i2c_lock:
-                    raw_data = bus.read_i2c_block_data(MPU9250_ADDR, ACCEL_XOUT_H, 14)
-                
-                # Accelerometer (±2g range)
-                ax = struct.unpack('>h', bytes(raw_data[0:2]))[0] / 16384.0
-                ay = struct.unpack('>h', bytes(raw_data[2:4]))[0] / 16384.0
-                az = struct.unpack('>h', bytes(raw_data[4:6]))[0] / 16384.0
-                
-                # Temperature
-                temp = struct.unpack('>h', bytes(raw_data[6:8]))[0] / 340.0 + 36.53
-                
-                # Gyroscope (±250°/s range)
-                gx = struct.unpack('>h', bytes(raw_data[8:10]))[0] / 131.0
-                gy = struct.unpack('>h', bytes(raw_data[10:12]))[0] / 131.0
-                gz = struct.unpack('>h', bytes(raw_data[12:14]))[0] / 131.0
-                
-                return {
-                    'ax': round(ax, 4), 'ay': round(ay, 4), 'az': round(az, 4),
-                    'gx': round(gx, 4), 'gy': round(gy, 4), 'gz': round(gz, 4),
-                    'temp': round(temp, 2)
-                }
-                
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(0.01 * (attempt + 1))  # Progressive delay
-                    continue
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += CSV_BLOCK_SIZE
+            try:
+                self._queue.put_nowait(block)
+            except queue.Full:
+                pass
+
+    def _run(self):
+        last_flush_time = time.time()
+        running = True
+        while running:
+            batch = []
+            try:
+                block = self._queue.get(timeout=CSV_FLUSH_INTERVAL)
+                while block is not None:
+                    batch.append(block)
+                    if len(batch) >= CSV_WRITE_BATCH:
+                        break
+                    block = self._queue.get_nowait()
                 else:
-                    # Only print error on final attempt to reduce spam
-                    if attempt == max_retries - 1:
-                        print(f"❌ IMU read error after {max_retries} attempts: {e}")
-                    return None
-        
-        return None
+                    running = False  # None is the stop sentinel
+            except queue.Empty:
+                pass
+
+            try:
+                if batch:
+                    self._file.write(b''.join([_format_csv_row(r) for block in batch
+                                               for r in block.tolist()]))
+
+                now = time.time()
+                if not running or now - last_flush_time >= CSV_FLUSH_INTERVAL:
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    last_flush_time = now
+            except Exception as e:
+                print(f"❌ CSV write error: {e}")
+
+        self._file.close()
+
+    def stop(self, timeout=5.0):
+        """Write out everything queued so far, then close the file"""
+        if self._n:
+            self._queue.put(self._block[:self._n])
+            self._n = 0
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self.dropped:
+            print(f"⚠️  CSV writer dropped {self.dropped} rows")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
 
 # Initialize sensors
 print("Initializing sensors...")
-imu = IMU6Axis()
+imu = IMU6Axis(bus, i2c_lock)
 
 # Initialize heart rate sensor with different I2C instance if needed
 try:
@@ -119,11 +213,21 @@ except Exception as e:
 # Initialize fall detector
 if FALL_DETECTION_ENABLED:
     try:
-        fall_detector = RealTimeFallDetector('fall_detector_model.pkl')
+        # Model runs once per FALL_STRIDE samples on the batch of their features
+        fall_detector = StridedFallDetector(RealTimeFallDetector('fall_detector_model.pkl'),
+                                            stride=FALL_STRIDE)
     except Exception as e:
         print(f"⚠️  Fall detector initialization failed: {e}")
         FALL_DETECTION_ENABLED = False
 
+def count_lines(filename, chunk_size=1 << 16):
+    """Count newlines in a file by streaming fixed-size chunks (O(1) memory)"""
+    count = 0
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            count += chunk.count(b'\n')
+    return count
+
 def log_sensor_data():
     """Main function with improved I2C handling and fall detection"""
     try:
@@ -160,175 +264,188 @@ def log_sensor_data():
         print(f"\n📊 Starting data logging to: {filename}")
         print("Press Ctrl+C to stop logging\n")
         
-        # CSV file handling with fall detection columns
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            # Define fieldnames including fall detection
-            fieldnames = [
-                'timestamp', 'datetime',
-                'ax', 'ay', 'az',           # Accelerometer (g)
-                'gx', 'gy', 'gz',           # Gyroscope (°/s)  
-                'temp',                     # Temperature (°C)
-                'bpm', 'spo2',             # Vital signs
-                'finger_detected',          # Status flag
-                'fall_predicted',           # Fall prediction (0/1)
-                'fall_confidence',          # Confidence score
-                'accel_magnitude',          # Feature for analysis
-                'gyro_magnitude'            # Feature for analysis
-            ]
-            
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            
+        # CSV file handling with fall detection columns; rows are written by a
+        # background thread so disk IO never stalls the sampling loop
+        with CSVWriter(filename, CSV_FIELDNAMES) as csv_writer:
             print("CSV Header written. Starting data collection...")
             
             sample_count = 0
             last_console_time = 0
             successful_reads = 0
             failed_reads = 0
+            # Reused fall-detector input (ax, ay, az, gx, gy, gz), filled in place
+            imu_vec = np.empty(6, dtype=np.float32)
+            # "%Y-%m-%d %H:%M:%S" part of the timestamp, re-formatted once per second
+            cached_second = None
+            date_prefix = ''
+            # Rows of the current fall-detector stride, held until its verdict says
+            # which reading (if any) the fall belongs to
+            stride_rows = []
+            # Absolute deadline of the next sample, so loop work doesn't stretch the period
+            next_tick = time.monotonic()
             
-            while True:
-                current_time = time.time()
-                datetime_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            # Hot-loop callables bound to locals once (fast local lookups per sample)
+            read_imu = imu.read_data
+            now = time.time
+            monotonic = time.monotonic
+            sleep = time.sleep
+            queue_row = csv_writer.write
+            process_fall = fall_detector.process_vec if FALL_DETECTION_ENABLED else None
+            
+            try:
+                while True:
+                    current_time = now()
+                    # Same "%Y-%m-%d %H:%M:%S.mmm" format, derived from current_time
+                    second = int(current_time)
+                    if second != cached_second:
+                        date_prefix = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second))
+                        cached_second = second
+                    datetime_str = f"{date_prefix}.{int((current_time - second) * 1000):03d}"
+                
+                    # Read IMU data with better error handling
+                    imu_data = read_imu()
                 
-                # Read IMU data with better error handling
-                imu_data = imu.read_data()
+                    if imu_data is None:
+                        failed_reads += 1
+                        if failed_reads % 10 == 0:  # Only print every 10th failure
+                            print(f"⚠️  IMU data unavailable (failed: {failed_reads}, success: {successful_reads})")
+                        sleep(0.05)  # Shorter delay for faster recovery
+                        continue
                 
-                if imu_data is None:
-                    failed_reads += 1
-                    if failed_reads % 10 == 0:  # Only print every 10th failure
-                        print(f"⚠️  IMU data unavailable (failed: {failed_reads}, success: {successful_reads})")
-                    time.sleep(0.05)  # Shorter delay for faster recovery
-                    continue
+                    successful_reads += 1
                 
-                successful_reads += 1
+                    # Get vital signs with error handling
+                    bpm = 0
+                    spo2 = None
+                    finger_detected = False
                 
-                # Get vital signs with error handling
-                bpm = 0
-                spo2 = None
-                finger_detected = False
+                    if hr_monitor:
+                        try:
+                            bpm = hr_monitor.bpm
+                            spo2 = hr_monitor.spo2
+                            finger_detected = bpm > 0
+                        except Exception as e:
+                            pass  # Ignore heart rate errors
                 
-                if hr_monitor:
-                    try:
-                        bpm = getattr(hr_monitor, 'bpm', 0) or 0
-                        spo2 = getattr(hr_monitor, 'spo2', None)
-                        finger_detected = bpm > 0
-                    except Exception as e:
-                        pass  # Ignore heart rate errors
+                    # Fall detection processing
+                    fall_predicted = False
+                    fall_confidence = 0.0
+                    fall_result = None
+                    # Computed once and reused for the alert, CSV and console
+                    accel_magnitude, gyro_magnitude = imu_mags(
+                        imu_data['ax'], imu_data['ay'], imu_data['az'],
+                        imu_data['gx'], imu_data['gy'], imu_data['gz'])
                 
-                # Fall detection processing
-                fall_predicted = False
-                fall_confidence = 0.0
-                accel_magnitude = 0.0
-                gyro_magnitude = 0.0
+                    # Row in CSV_FIELDNAMES order; fall columns are filled in below
+                    row = [
+                        current_time, datetime_str,
+                        imu_data['ax'], imu_data['ay'], imu_data['az'],
+                        imu_data['gx'], imu_data['gy'], imu_data['gz'],
+                        imu_data['temp'],
+                        bpm, spo2 if spo2 is not None else np.nan,
+                        finger_detected, False,
+                        0.0, accel_magnitude, gyro_magnitude
+                    ]
                 
-                if FALL_DETECTION_ENABLED:
-                    try:
-                        # Prepare sensor data for fall detection
-                        sensor_data = {
-                            'ax': imu_data['ax'],
-                            'ay': imu_data['ay'], 
-                            'az': imu_data['az'],
-                            'gx': imu_data['gx'],
-                            'gy': imu_data['gy'],
-                            'gz': imu_data['gz']
-                        }
+                    if FALL_DETECTION_ENABLED:
+                        try:
+                            # Fill the fall-detector input vector in place
+                            imu_vec[0] = imu_data['ax']
+                            imu_vec[1] = imu_data['ay']
+                            imu_vec[2] = imu_data['az']
+                            imu_vec[3] = imu_data['gx']
+                            imu_vec[4] = imu_data['gy']
+                            imu_vec[5] = imu_data['gz']
                         
-                        # Process fall detection
-                        fall_result = fall_detector.process_sensor_reading(sensor_data)
-                        fall_predicted = fall_result['fall_detected']
-                        fall_confidence = fall_result['confidence']
+                            # Process fall detection
+                            fall_result = process_fall(imu_vec)
+                            fall_predicted = fall_result['fall_detected']
+                            fall_confidence = fall_result['confidence']
+                            row[CSV_FALL_CONFIDENCE_COL] = fall_confidence
+                            stride_rows.append(row)
                         
-                        # Handle fall detection alert
-                        if fall_predicted:
-                            print("🚨 FALL DETECTED! Sending emergency alert...")
+                            # Handle fall detection alert
+                            if fall_predicted:
+                                print("🚨 FALL DETECTED! Sending emergency alert...")
                             
-                            # Prepare fall data for alert
-                            fall_alert_data = {
-                                'confidence': fall_confidence,
-                                'heart_rate': bpm,
-                                'accel_magnitude': accel_magnitude,
-                                'temperature': imu_data['temp'],
-                                'timestamp': datetime_str
-                            }
+                                # The batch verdict names the reading that triggered it
+                                # and both fall columns go on that row
+                                fall_row = stride_rows[max(0, len(stride_rows) - 1 - fall_result.get('lag', 0))]
+                                row[CSV_FALL_CONFIDENCE_COL] = NO_FALL_CONFIDENCE
+                                fall_row[CSV_FALL_PREDICTED_COL] = True
+                                fall_row[CSV_FALL_CONFIDENCE_COL] = fall_confidence
                             
-                            # Send emergency alert with GPS location
-                            if gps_started and emergency_system:
-                                try:
-                                    alert_message = emergency_system.send_fall_alert(fall_alert_data)
-                                    print(f"📞 Emergency alert sent: {alert_message}")
-                                except Exception as e:
-                                    print(f"❌ Failed to send emergency alert: {e}")
-                            else:
-                                print("⚠️ Fall detected but GPS/Emergency system not available")
-                        
-                        if 'features' in fall_result:
-                            accel_magnitude = fall_result['features'].get('accel_magnitude', 0.0)
-                            gyro_magnitude = fall_result['features'].get('gyro_magnitude', 0.0)
-                    except Exception as e:
-                        # Calculate basic magnitudes if fall detection fails
-                        accel_magnitude = (imu_data['ax']**2 + imu_data['ay']**2 + imu_data['az']**2)**0.5
-                        gyro_magnitude = (imu_data['gx']**2 + imu_data['gy']**2 + imu_data['gz']**2)**0.5
-                
-                # Prepare data row with all values explicitly
-                data_row = {
-                    'timestamp': round(current_time, 3),
-                    'datetime': datetime_str,
-                    'ax': imu_data['ax'],
-                    'ay': imu_data['ay'], 
-                    'az': imu_data['az'],
-                    'gx': imu_data['gx'],
-                    'gy': imu_data['gy'],
-                    'gz': imu_data['gz'],
-                    'temp': imu_data['temp'],
-                    'bpm': bpm,
-                    'spo2': spo2 if spo2 is not None else '',
-                    'finger_detected': finger_detected,
-                    'fall_predicted': fall_predicted,
-                    'fall_confidence': round(fall_confidence, 3),
-                    'accel_magnitude': round(accel_magnitude, 3),
-                    'gyro_magnitude': round(gyro_magnitude, 3)
-                }
+                                # Prepare fall data for alert, from the fall reading
+                                fall_alert_data = {
+                                    'confidence': fall_confidence,
+                                    'heart_rate': fall_row[CSV_BPM_COL],
+                                    'accel_magnitude': fall_result['features']['accel_magnitude'],
+                                    'temperature': fall_row[CSV_TEMP_COL],
+                                    'timestamp': fall_row[CSV_DATETIME_COL]
+                                }
+                            
+                                # Send emergency alert with GPS location
+                                if gps_started and emergency_system:
+                                    try:
+                                        alert_message = emergency_system.send_fall_alert(fall_alert_data)
+                                        print(f"📞 Emergency alert sent: {alert_message}")
+                                    except Exception as e:
+                                        print(f"❌ Failed to send emergency alert: {e}")
+                                else:
+                                    print("⚠️ Fall detected but GPS/Emergency system not available")
+                        except Exception as e:
+                            pass  # Keep logging raw data if fall detection fails
                 
-                # Write to CSV
-                writer.writerow(data_row)
-                csvfile.flush()  # Force write to disk immediately
+                    # Queue rows for the writer thread once the stride they belong to is decided
+                    if fall_result is None or not fall_result.get('pending'):
+                        if fall_result is None:
+                            stride_rows.append(row)
+                        for stride_row in stride_rows:
+                            queue_row(tuple(stride_row))
+                        stride_rows.clear()
                 
-                sample_count += 1
+                    sample_count += 1
                 
-                # Console output every 2 seconds
-                if current_time - last_console_time >= 2.0:
-                    finger_status = "👆 ON " if finger_detected else "👋 OFF"
-                    spo2_display = f"{spo2:.1f}%" if spo2 is not None else "---"
-                    bpm_display = f"{bpm} BPM" if bpm > 0 else "--- BPM"
-                    
-                    fall_status = ""
-                    if FALL_DETECTION_ENABLED:
-                        if fall_predicted:
-                            fall_status = f"🚨 FALL RISK: {fall_confidence:.2f}"
-                        else:
-                            fall_status = f"✅ Safe ({fall_confidence:.2f})"
+                    # Console output every 2 seconds
+                    if current_time - last_console_time >= 2.0:
+                        finger_status = "👆 ON " if finger_detected else "👋 OFF"
+                        spo2_display = f"{spo2:.1f}%" if spo2 is not None else "---"
+                        bpm_display = f"{bpm} BPM" if bpm > 0 else "--- BPM"
                     
-                    # Calculate current acceleration for display
-                    current_accel_mag = (imu_data['ax']**2 + imu_data['ay']**2 + imu_data['az']**2)**0.5
+                        fall_status = ""
+                        if FALL_DETECTION_ENABLED:
+                            if fall_predicted:
+                                fall_status = f"🚨 FALL RISK: {fall_confidence:.2f}"
+                            else:
+                                fall_status = f"✅ Safe ({fall_confidence:.2f})"
                     
-                    print(f"[{sample_count:04d}] {datetime_str[:19]} | "
-                          f"Finger: {finger_status} | "
-                          f"HR: {bpm_display} | "
-                          f"SpO2: {spo2_display}")
-                    print(f"         Accel: ({imu_data['ax']:+.3f}, {imu_data['ay']:+.3f}, {imu_data['az']:+.3f}) "
-                          f"Mag: {current_accel_mag:.3f}g | "
-                          f"Gyro: ({imu_data['gx']:+.1f}, {imu_data['gy']:+.1f}, {imu_data['gz']:+.1f})")
+                        print(f"[{sample_count:04d}] {datetime_str[:19]} | "
+                              f"Finger: {finger_status} | "
+                              f"HR: {bpm_display} | "
+                              f"SpO2: {spo2_display}")
+                        print(f"         Accel: ({imu_data['ax']:+.3f}, {imu_data['ay']:+.3f}, {imu_data['az']:+.3f}) "
+                              f"Mag: {accel_magnitude:.3f}g | "
+                              f"Gyro: ({imu_data['gx']:+.1f}, {imu_data['gy']:+.1f}, {imu_data['gz']:+.1f})")
                     
-                    if FALL_DETECTION_ENABLED:
-                        print(f"         Fall Detection: {fall_status}")
+                        if FALL_DETECTION_ENABLED:
+                            print(f"         Fall Detection: {fall_status}")
                     
-                    print(f"         I2C Status: ✅{successful_reads} ❌{failed_reads}")
-                    print()
+                        print(f"         I2C Status: ✅{successful_reads} ❌{failed_reads}")
+                        print()
                     
-                    last_console_time = current_time
+                        last_console_time = current_time
                 
-                # 10Hz sampling rate (0.1 second intervals)
-                time.sleep(0.1)
+                    # 10Hz sampling rate: sleep until the next deadline
+                    next_tick += SAMPLE_PERIOD
+                    delay = next_tick - monotonic()
+                    if delay > 0:
+                        sleep(delay)
+                    else:
+                        next_tick = monotonic()  # Overran - re-sync instead of bursting
+            finally:
+                # Rows of an unfinished stride still go to the CSV
+                for stride_row in stride_rows:
+                    queue_row(tuple(stride_row))
                 
     except KeyboardInterrupt:
         print(f"\n\n🛑 Data collection stopped by user")
@@ -344,17 +461,15 @@ def log_sensor_data():
         
         # Final CSV verification
         try:
-            with open(filename, 'r') as f:
-                lines = f.readlines()
-                print(f"✅ CSV file saved successfully: {filename}")
-                print(f"📊 Total samples: {len(lines)-1}")  # -1 for header
-                print(f"📁 File size: {len(open(filename).read())} bytes")
-                print(f"📈 I2C Success rate: {successful_reads/(successful_reads+failed_reads)*100:.1f}%")
-                
-                if FALL_DETECTION_ENABLED:
-                    print(f"🤖 Fall detection was active during recording")
-                if gps_started:
-                    print(f"🛰️  GPS tracking was active during recording")
+            print(f"✅ CSV file saved successfully: {filename}")
+            print(f"📊 Total samples: {count_lines(filename)-1}")  # -1 for header
+            print(f"📁 File size: {os.path.getsize(filename)} bytes")
+            print(f"📈 I2C Success rate: {successful_reads/(successful_reads+failed_reads)*100:.1f}%")
+            
+            if FALL_DETECTION_ENABLED:
+                print(f"🤖 Fall detection was active during recording")
+            if gps_started:
+                print(f"🛰️  GPS tracking was active during recording")
                     
         except Exception as e:
             print(f"❌ Error verifying CSV file: {e}")
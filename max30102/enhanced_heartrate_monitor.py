@@ -9,6 +9,8 @@ class EnhancedHeartRateMonitor(object):
     """Enhanced HeartRateMonitor with raw PPG access for blood pressure estimation"""
     
     LOOP_TIME = 0.01
+    PPG_RATE = 50            # Hz
+    PPG_BUFFER_SIZE = 2500   # 50 seconds at 50Hz
     
     def __init__(self, print_raw=False, print_result=False):
         self.bpm = 0
@@ -16,15 +18,27 @@ class EnhancedHeartRateMonitor(object):
         self.print_raw = print_raw
         self.print_result = print_result
         
-        # Raw PPG data for blood pressure estimation
-        self.raw_ir_buffer = deque(maxlen=2500)  # 50 seconds at 50Hz
-        self.raw_red_buffer = deque(maxlen=2500)
-        self.ppg_timestamps = deque(maxlen=2500)
+        # Raw PPG data for blood pressure estimation, kept in preallocated
+        # ring buffers indexed by a monotonic write counter
+        self._ir = np.empty(self.PPG_BUFFER_SIZE, dtype=np.int32)
+        self._red = np.empty(self.PPG_BUFFER_SIZE, dtype=np.int32)
+        self._ts = np.empty(self.PPG_BUFFER_SIZE, dtype=np.float64)
+        self._w = 0
+        self._n = 0
+        
+        # Newest sample, so per-tick consumers don't copy the whole history
+        self.latest_ir = None
+        self.latest_red = None
+        self.latest_ppg_time = None
         
     def run_sensor(self):
         sensor = MAX30102()
-        ir_data = []
-        red_data = []
+        # Last 100 samples for HR/SpO2 calculation; older ones fall off the left
+        ir_data = deque(maxlen=hrcalc.BUFFER_SIZE)
+        red_data = deque(maxlen=hrcalc.BUFFER_SIZE)
+        # Running window sums for finger detection, updated as samples enter/leave
+        ir_sum = 0
+        red_sum = 0
         bpms = []
         
         while not self._thread.stopped:
@@ -36,25 +50,35 @@ class EnhancedHeartRateMonitor(object):
                     num_bytes -= 1
                     
                     # Store for HR/SpO2 calculation
+                    if len(ir_data) == hrcalc.BUFFER_SIZE:
+                        ir_sum -= ir_data[0]
+                        red_sum -= red_data[0]
                     ir_data.append(ir)
                     red_data.append(red)
+                    ir_sum += ir
+                    red_sum += red
                     
                     # NEW: Store raw PPG data with timestamps for BP estimation
                     current_time = time.time()
-                    self.raw_ir_buffer.append(ir)
-                    self.raw_red_buffer.append(red)
-                    self.ppg_timestamps.append(current_time)
+                    idx = self._w % self.PPG_BUFFER_SIZE
+                    self._ir[idx] = ir
+                    self._red[idx] = red
+                    self._ts[idx] = current_time
+                    self._w += 1
+                    if self._n < self.PPG_BUFFER_SIZE:
+                        self._n += 1
+                    self.latest_ir = ir
+                    self.latest_red = red
+                    self.latest_ppg_time = current_time
                     
                     if self.print_raw:
                         print("{0}, {1}".format(ir, red))
                 
-                # Keep last 100 samples for HR/SpO2 calculation
-                while len(ir_data) > 100:
-                    ir_data.pop(0)
-                    red_data.pop(0)
-                
-                if len(ir_data) == 100:
-                    bpm, valid_bpm, spo2, valid_spo2 = hrcalc.calc_hr_and_spo2(ir_data, red_data)
+                if len(ir_data) == hrcalc.BUFFER_SIZE:
+                    # int64 keeps hrcalc's AC*DC products from overflowing
+                    ir_arr = np.fromiter(ir_data, dtype=np.int64, count=hrcalc.BUFFER_SIZE)
+                    red_arr = np.fromiter(red_data, dtype=np.int64, count=hrcalc.BUFFER_SIZE)
+                    bpm, valid_bpm, spo2, valid_spo2 = hrcalc.calc_hr_and_spo2(ir_arr, red_arr)
                     
                     if valid_bpm:
                         bpms.append(bpm)
@@ -65,8 +89,8 @@ class EnhancedHeartRateMonitor(object):
                         if valid_spo2 and spo2 > 0:
                             self.spo2 = spo2
                     
-                    # Check finger detection
-                    if (np.mean(ir_data) < 50000 and np.mean(red_data) < 50000):
+                    # Check finger detection (window mean < 50000, compared as sums)
+                    if (ir_sum < hrcalc.BUFFER_SIZE * 50000 and red_sum < hrcalc.BUFFER_SIZE * 50000):
                         self.bpm = 0
                         self.spo2 = None
                         if self.print_result:
@@ -81,16 +105,27 @@ class EnhancedHeartRateMonitor(object):
     
     def get_raw_ppg_data(self, duration_seconds=50):
         """Get raw PPG data for blood pressure estimation"""
-        if len(self.raw_ir_buffer) < duration_seconds * 50:  # 50Hz sampling
+        num_samples = int(duration_seconds * self.PPG_RATE)
+        if num_samples > self._n:
             return None, None, None
         
-        # Return last N seconds of data
-        num_samples = duration_seconds * 50
-        ir_data = list(self.raw_ir_buffer)[-num_samples:]
-        red_data = list(self.raw_red_buffer)[-num_samples:]
-        timestamps = list(self.ppg_timestamps)[-num_samples:]
-        
-        return ir_data, red_data, timestamps
+        # Return last N seconds of data as oldest-first ndarrays
+        end = self._w % self.PPG_BUFFER_SIZE
+        start = end - num_samples
+        return (self._ring_window(self._ir, start, end),
+                self._ring_window(self._red, start, end),
+                self._ring_window(self._ts, start, end))
+    
+    @staticmethod
+    def _ring_window(buf, start, end):
+        """Copy buf[start:end] out of a ring buffer, where start may be negative (wrapped)"""
+        if start >= 0:
+            return buf[start:end].copy()
+        return np.concatenate((buf[start:], buf[:end]))
+    
+    def get_latest_ppg(self):
+        """Get the newest raw PPG sample without copying the history buffers"""
+        return self.latest_ir, self.latest_red, self.latest_ppg_time
     
     def start_sensor(self):
         self._thread = threading.Thread(target=self.run_sensor)
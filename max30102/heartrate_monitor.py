@@ -4,6 +4,7 @@ from . import hrcalc
 import threading
 import time
 import numpy as np
+from collections import deque
 
 
 class HeartRateMonitor(object):
@@ -15,6 +16,7 @@ class HeartRateMonitor(object):
 
     def __init__(self, print_raw=False, print_result=False):
         self.bpm = 0
+        self.spo2 = None
         if print_raw is True:
             print('IR, Red')
         self.print_raw = print_raw
@@ -22,8 +24,12 @@ class HeartRateMonitor(object):
 
     def run_sensor(self):
         sensor = MAX30102()
-        ir_data = []
-        red_data = []
+        # Last 100 samples for HR/SpO2 calculation; older ones fall off the left
+        ir_data = deque(maxlen=hrcalc.BUFFER_SIZE)
+        red_data = deque(maxlen=hrcalc.BUFFER_SIZE)
+        # Running window sums for finger detection, updated as samples enter/leave
+        ir_sum = 0
+        red_sum = 0
         bpms = []
 
         # run until told to stop
@@ -35,23 +41,27 @@ class HeartRateMonitor(object):
                 while num_bytes > 0:
                     red, ir = sensor.read_fifo()
                     num_bytes -= 1
+                    if len(ir_data) == hrcalc.BUFFER_SIZE:
+                        ir_sum -= ir_data[0]
+                        red_sum -= red_data[0]
                     ir_data.append(ir)
                     red_data.append(red)
+                    ir_sum += ir
+                    red_sum += red
                     if self.print_raw:
                         print("{0}, {1}".format(ir, red))
 
-                while len(ir_data) > 100:
-                    ir_data.pop(0)
-                    red_data.pop(0)
-
-                if len(ir_data) == 100:
-                    bpm, valid_bpm, spo2, valid_spo2 = hrcalc.calc_hr_and_spo2(ir_data, red_data)
+                if len(ir_data) == hrcalc.BUFFER_SIZE:
+                    # int64 keeps hrcalc's AC*DC products from overflowing
+                    ir_arr = np.fromiter(ir_data, dtype=np.int64, count=hrcalc.BUFFER_SIZE)
+                    red_arr = np.fromiter(red_data, dtype=np.int64, count=hrcalc.BUFFER_SIZE)
+                    bpm, valid_bpm, spo2, valid_spo2 = hrcalc.calc_hr_and_spo2(ir_arr, red_arr)
                     if valid_bpm:
                         bpms.append(bpm)
                         while len(bpms) > 4:
                             bpms.pop(0)
                         self.bpm = np.mean(bpms)
-                        if (np.mean(ir_data) < 50000 and np.mean(red_data) < 50000):
+                        if (ir_sum < hrcalc.BUFFER_SIZE * 50000 and red_sum < hrcalc.BUFFER_SIZE * 50000):
                             self.bpm = 0
                             if self.print_result:
                                 print("Finger not detected")
@@ -2,6 +2,15 @@
 
 import numpy as np
 
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional - fall back to plain Python kernels
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 # 25 samples per second (in algorithm.h)
 SAMPLE_FREQ = 25
 # taking moving average of 4 samples when calculating HR
@@ -11,23 +20,32 @@ MA_SIZE = 4
 BUFFER_SIZE = 100
 
 
-# this assumes ir_data and red_data as np.array
 def calc_hr_and_spo2(ir_data, red_data):
     """
     By detecting  peaks of PPG cycle and corresponding AC/DC
     of red/infra-red signal, the an_ratio for the SPO2 is computed.
+    Accepts lists or arrays; the work is done by a compiled kernel.
     """
+    # int64 so the AC * DC products below cannot overflow
+    hr, hr_valid, spo2, spo2_valid = _calc_hr_and_spo2(
+        np.asarray(ir_data, dtype=np.int64), np.asarray(red_data, dtype=np.int64))
+    return hr, bool(hr_valid), spo2, bool(spo2_valid)
+
+
+@njit(cache=True)
+def _calc_hr_and_spo2(ir_data, red_data):
+    """calc_hr_and_spo2 on int64 arrays"""
     # get dc mean
     ir_mean = int(np.mean(ir_data))
 
     # remove DC mean and inver signal
     # this lets peak detecter detect valley
-    x = -1 * (np.array(ir_data) - ir_mean)
+    x = -1 * (ir_data - ir_mean)
 
     # 4 point moving average
     # x is np.array with int values, so automatically casted to int
     for i in range(x.shape[0] - MA_SIZE):
-        x[i] = np.sum(x[i:i+MA_SIZE]) / MA_SIZE
+        x[i] = int(np.sum(x[i:i+MA_SIZE]) / MA_SIZE)
 
     # calculate threshold
     n_th = int(np.mean(x))
@@ -58,12 +76,12 @@ def calc_hr_and_spo2(ir_data, red_data):
     # FIXME: needed??
     for i in range(exact_ir_valley_locs_count):
         if ir_valley_locs[i] > BUFFER_SIZE:
-            spo2 = -999  # do not use SPO2 since valley loc is out of range
+            spo2 = -999.0  # do not use SPO2 since valley loc is out of range
             spo2_valid = False
             return hr, hr_valid, spo2, spo2_valid
 
     i_ratio_count = 0
-    ratio = []
+    ratio = np.empty(5, dtype=np.int64)
 
     # find max between two valley locations
     # and use ratio between AC component of Ir and Red DC component of Ir and Red for SpO2
@@ -95,18 +113,18 @@ def calc_hr_and_spo2(ir_data, red_data):
                 # original cpp implementation uses overflow intentionally.
                 # but at 64-bit OS, Pyhthon 3.X uses 64-bit int and nume*100/denom does not trigger overflow
                 # so using bit operation ( &0xffffffff ) is needed
-                ratio.append(int(((nume * 100) & 0xffffffff) / denom))
+                ratio[i_ratio_count] = int(((nume * 100) & 0xffffffff) / denom)
                 i_ratio_count += 1
 
     # choose median value since PPG signal may vary from beat to beat
-    ratio = sorted(ratio)  # sort to ascending order
+    ratio = np.sort(ratio[:i_ratio_count])  # sort to ascending order
     mid_index = int(i_ratio_count / 2)
 
     ratio_ave = 0
     if mid_index > 1:
         ratio_ave = int((ratio[mid_index-1] + ratio[mid_index])/2)
     else:
-        if len(ratio) != 0:
+        if i_ratio_count != 0:
             ratio_ave = ratio[mid_index]
 
     # why 184?
@@ -116,12 +134,13 @@ def calc_hr_and_spo2(ir_data, red_data):
         spo2 = -45.060 * (ratio_ave**2) / 10000.0 + 30.054 * ratio_ave / 100.0 + 94.845
         spo2_valid = True
     else:
-        spo2 = -999
+        spo2 = -999.0
         spo2_valid = False
 
     return hr, hr_valid, spo2, spo2_valid
 
 
+@njit(cache=True)
 def find_peaks(x, size, min_height, min_dist, max_num):
     """
     Find at most MAX_NUM peaks above MIN_HEIGHT separated by at least MIN_DISTANCE
@@ -129,11 +148,12 @@ def find_peaks(x, size, min_height, min_dist, max_num):
     ir_valley_locs, n_peaks = find_peaks_above_min_height(x, size, min_height, max_num)
     ir_valley_locs, n_peaks = remove_close_peaks(n_peaks, ir_valley_locs, x, min_dist)
 
-    n_peaks = min([n_peaks, max_num])
+    n_peaks = min(n_peaks, max_num)
 
     return ir_valley_locs, n_peaks
 
 
+@njit(cache=True)
 def find_peaks_above_min_height(x, size, min_height, max_num):
     """
     Find all peaks above MIN_HEIGHT
@@ -141,7 +161,7 @@ def find_peaks_above_min_height(x, size, min_height, max_num):
 
     i = 0
     n_peaks = 0
-    ir_valley_locs = []  # [0 for i in range(max_num)]
+    ir_valley_locs = np.empty(max_num, dtype=np.int64)
     while i < size - 1:
         if x[i] > min_height and x[i] > x[i-1]:  # find the left edge of potential peaks
             n_width = 1
@@ -150,8 +170,7 @@ def find_peaks_above_min_height(x, size, min_height, max_num):
             while i + n_width < size - 1 and x[i] == x[i+n_width]:  # find flat peaks
                 n_width += 1
             if x[i] > x[i+n_width] and n_peaks < max_num:  # find the right edge of peaks
-                # ir_valley_locs[n_peaks] = i
-                ir_valley_locs.append(i)
+                ir_valley_locs[n_peaks] = i
                 n_peaks += 1  # original uses post increment
                 i += n_width + 1
             else:
@@ -159,9 +178,10 @@ def find_peaks_above_min_height(x, size, min_height, max_num):
         else:
             i += 1
 
-    return ir_valley_locs, n_peaks
+    return ir_valley_locs[:n_peaks], n_peaks
 
 
+@njit(cache=True)
 def remove_close_peaks(n_peaks, ir_valley_locs, x, min_dist):
     """
     Remove peaks separated by less than MIN_DISTANCE
@@ -170,8 +190,9 @@ def remove_close_peaks(n_peaks, ir_valley_locs, x, min_dist):
     # should be equal to maxim_sort_indices_descend
     # order peaks from large to small
     # should ignore index:0
-    sorted_indices = sorted(ir_valley_locs, key=lambda i: x[i])
-    sorted_indices.reverse()
+    # (stable ascending sort then reversed, same order as sorted(...).reverse())
+    order = np.argsort(x[ir_valley_locs], kind='mergesort')[::-1]
+    sorted_indices = ir_valley_locs[order]
 
     # this "for" loop expression does not check finish condition
     # for i in range(-1, n_peaks):
@@ -190,6 +211,6 @@ def remove_close_peaks(n_peaks, ir_valley_locs, x, min_dist):
             j += 1
         i += 1
 
-    sorted_indices[:n_peaks] = sorted(sorted_indices[:n_peaks])
+    sorted_indices[:n_peaks] = np.sort(sorted_indices[:n_peaks])
 
     return sorted_indices, n_peaks
@@ -1,22 +1,108 @@
 import numpy as np
 from scipy import signal
+import os
 import time
 from collections import deque
 
 import sys
 sys.path.append('/home/raspberry/PPG2ABP')
-from PPG2ABP.model import PPG2ABPModel
+
+# Keras model is only needed when no converted TFLite model is available
+try:
+    from PPG2ABP.model import PPG2ABPModel
+except ImportError:
+    PPG2ABPModel = None
+
+# tflite_runtime is optional - a few MB instead of full TensorFlow on the Pi
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    Interpreter = None
+
+PPG2ABP_WEIGHTS = '/home/raspberry/PPG2ABP/trained_model.h5'
+PPG2ABP_TFLITE = '/home/raspberry/PPG2ABP/ppg2abp_int8.tflite'
+
+# MAX30102 PPG sample rate and the pulse band kept before inference
+PPG_SAMPLE_RATE = 50
+PPG_BAND = (0.5, 8.0)
 
 class PPG2ABPIntegration:
-    def __init__(self):
-        self.model = PPG2ABPModel()
-        self.model.load_weights('/home/raspberry/PPG2ABP/trained_model.h5')
-        
+    def __init__(self, tflite_path=PPG2ABP_TFLITE):
+        self.model = None
+        self.interpreter = None
+
+        if Interpreter is not None and os.path.exists(tflite_path):
+            self.interpreter = Interpreter(model_path=tflite_path)
+            self.interpreter.allocate_tensors()
+            self._input = self.interpreter.get_input_details()[0]
+            self._output = self.interpreter.get_output_details()[0]
+            print("✅ PPG2ABP int8 TFLite model loaded")
+        elif PPG2ABPModel is not None:
+            self.model = PPG2ABPModel()
+            self.model.load_weights(PPG2ABP_WEIGHTS)
+        else:
+            raise ImportError(
+                "No PPG2ABP backend available: install tflite_runtime and provide "
+                f"{tflite_path}, or make the Keras PPG2ABP.model package importable")
+
+        # Band-pass designed once; sosfiltfilt applies it forward and backward
+        self._sos = signal.butter(4, PPG_BAND, btype='bandpass', fs=PPG_SAMPLE_RATE, output='sos')
+
+    def preprocess_ppg(self, ppg_signal):
+        """Band-pass, zero-mean and peak-normalize a PPG window into model input shape"""
+        x = np.asarray(ppg_signal, dtype=np.float32)
+        x = x - x.mean()
+        x = signal.sosfiltfilt(self._sos, x).astype(np.float32)
+        x /= np.abs(x).max() + 1e-6
+        return x[np.newaxis, :, np.newaxis]
+
     def estimate_bp(self, ppg_signal):
         # Preprocess PPG signal for PPG2ABP model
         processed_signal = self.preprocess_ppg(ppg_signal)
-        
+
+        if self.interpreter is not None:
+            # Systolic/diastolic are the peaks/troughs of the predicted ABP waveform
+            abp = self._invoke_tflite(processed_signal)
+            return float(abp.max()), float(abp.min())
+
         # Get BP estimation
         bp_prediction = self.model.predict(processed_signal)
-        
-        return bp_prediction['systolic'], bp_prediction['diastolic']
\ No newline at end of file
+
+        return bp_prediction['systolic'], bp_prediction['diastolic']
+
+    def _invoke_tflite(self, x):
+        """Run one window through the TFLite model, (de)quantizing int8 tensors"""
+        details = self._input
+        if details['dtype'] == np.int8:
+            scale, zero_point = details['quantization']
+            x = np.clip(np.round(x / scale + zero_point), -128, 127).astype(np.int8)
+        self.interpreter.set_tensor(details['index'], x)
+        self.interpreter.invoke()
+
+        details = self._output
+        out = self.interpreter.get_tensor(details['index'])
+        if details['dtype'] == np.int8:
+            scale, zero_point = details['quantization']
+            out = (out.astype(np.float32) - zero_point) * scale
+        return out.ravel()
+
+def convert_to_tflite_int8(keras_model, calibration_windows, out_path=PPG2ABP_TFLITE):
+    """One-time (desktop) conversion of the Keras model to a full-int8 TFLite file,
+    calibrated on preprocessed (1, N, 1) PPG windows"""
+    import tensorflow as tf
+
+    def representative_dataset():
+        for window in calibration_windows:
+            yield [np.asarray(window, dtype=np.float32)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+
+    with open(out_path, 'wb') as f:
+        f.write(converter.convert())
+    print(f"✅ Saved int8 TFLite model to {out_path}")
+    return out_path
@@ -0,0 +1,80 @@
+# sensors/imu.py - MPU9250 accelerometer/gyroscope reader shared by the logging scripts
+import ctypes
+import struct
+import threading
+import time
+from smbus2 import i2c_msg
+from smbus2.smbus2 import I2C_M_RD
+
+MPU9250_ADDR = 0x68
+
+# MPU9250 registers (6-axis only)
+PWR_MGMT_1 = 0x6B
+ACCEL_XOUT_H = 0x3B
+
+# Accel XYZ, temp, gyro XYZ as big-endian int16, decoded in one call
+IMU_STRUCT = struct.Struct('>7h')
+# Scale factors for ±2g accel, temperature and ±250°/s gyro
+ACCEL_SCALE = 1 / 16384.0
+TEMP_SCALE = 1 / 340.0
+GYRO_SCALE = 1 / 131.0
+TEMP_OFFSET = 36.53
+
+class IMU6Axis:
+    def __init__(self, bus, lock=None):
+        """6-axis MPU9250 on an open smbus2 bus, sharing `lock` with other I2C users"""
+        self.bus = bus
+        self.lock = lock if lock is not None else threading.Lock()
+        self.setup_mpu()
+        
+    def setup_mpu(self):
+        """Initialize MPU9250 for 6-axis readings only"""
+        # Register-pointer write + 14-byte read, issued together as one combined
+        # transaction (repeated start); both messages are built once and reused.
+        # The read lands in our own buffer so it can be decoded in place
+        self._rbuf = ctypes.create_string_buffer(14)
+        self._rview = memoryview(self._rbuf)
+        self._wr = i2c_msg.write(MPU9250_ADDR, [ACCEL_XOUT_H])
+        self._rd = i2c_msg(addr=MPU9250_ADDR, flags=I2C_M_RD, len=14, buf=self._rbuf)
+        self._unpack = IMU_STRUCT.unpack_from
+        try:
+            with self.lock:
+                self.bus.write_byte_data(MPU9250_ADDR, PWR_MGMT_1, 0x00)
+                time.sleep(0.1)
+            print("✅ 6-axis IMU initialized successfully")
+            self.available = True
+        except Exception as e:
+            print(f"❌ IMU initialization failed: {e}")
+            self.available = False
+    
+    def read_data(self):
+        """Read accelerometer and gyroscope data with I2C protection"""
+        if not self.available:
+            return None
+            
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                with self.lock:
+                    self.bus.i2c_rdwr(self._wr, self._rd)
+                
+                ax, ay, az, t, gx, gy, gz = self._unpack(self._rview)
+                
+                # Raw floats; rounding is left to the CSV/console output
+                return {
+                    'ax': ax * ACCEL_SCALE, 'ay': ay * ACCEL_SCALE, 'az': az * ACCEL_SCALE,
+                    'gx': gx * GYRO_SCALE, 'gy': gy * GYRO_SCALE, 'gz': gz * GYRO_SCALE,
+                    'temp': t * TEMP_SCALE + TEMP_OFFSET
+                }
+                
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    time.sleep(0.01 * (attempt + 1))  # Progressive delay
+                    continue
+                else:
+                    # Only print error on final attempt to reduce spam
+                    if attempt == max_retries - 1:
+                        print(f"❌ IMU read error after {max_retries} attempts: {e}")
+                    return None
+        
+        return None
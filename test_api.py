@@ -7,9 +7,13 @@ def test_api():
     
     print("🧪 Testing API endpoints...")
     
+    # One keep-alive connection shared by all requests
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    
     # Test basic status
     try:
-        response = requests.get(f"{base_url}/")
+        response = session.get(f"{base_url}/")
         print(f"✅ Root endpoint: {response.status_code}")
         print(f"   Response: {response.json()}")
     except Exception as e:
@@ -17,7 +21,7 @@ def test_api():
     
     # Test API status
     try:
-        response = requests.get(f"{base_url}/api/status")
+        response = session.get(f"{base_url}/api/status")
         print(f"✅ Status endpoint: {response.status_code}")
         print(f"   Response: {response.json()}")
     except Exception as e:
@@ -25,7 +29,7 @@ def test_api():
     
     # Test generate report
     try:
-        response = requests.get(f"{base_url}/api/generate-report")
+        response = session.get(f"{base_url}/api/generate-report")
         print(f"✅ Generate report endpoint: {response.status_code}")
         if response.status_code == 200:
             print("   Report generated successfully!")
@@ -33,6 +37,8 @@ def test_api():
             print(f"   Error: {response.text}")
     except Exception as e:
         print(f"❌ Generate report endpoint failed: {e}")
+    
+    session.close()
 
 if __name__ == "__main__":
     test_api()
@@ -1,15 +1,44 @@
 # app.py - Flask backend for health dashboard
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
+import csv
 import json
 import time
 import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from typing import Optional
 import pandas as pd
 import glob
 import os
+import re
+from itertools import islice
 from datetime import datetime
 
+# pyarrow is optional - without it history is read straight from the CSV
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# orjson is optional - a much faster encoder for the float-heavy history payloads
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# watchdog is optional - without it the sensor loop polls the CSV once a second
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+
 # Environment variables
 from dotenv import load_dotenv
 load_dotenv()
@@ -26,26 +55,293 @@ except Exception as e:
     print(f"❌ Health analyzer import error: {e}")
     HEALTH_AI_AVAILABLE = False
 
+class ORJSONCodec:
+    """json-module stand-in backed by orjson, for python-socketio"""
+    # Sorted keys match the output of Flask's default provider
+    OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS) if orjson else 0
+    
+    @staticmethod
+    def dumps(obj, *args, default=None, **kwargs):
+        return orjson.dumps(obj, default=default, option=ORJSONCodec.OPTIONS).decode()
+    
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return orjson.loads(s)
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes jsonify responses with orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return ORJSONCodec.dumps(obj, default=self.default)
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'health-monitor-secret'
+if orjson:
+    app.json = ORJSONProvider(app)
 
 # Enable CORS for all routes
 CORS(app, origins=["http://localhost:3000"])
 
-socketio = SocketIO(app, cors_allowed_origins=["http://localhost:3000"])
-
-# Global variable to store latest sensor data
-latest_data = {
-    'heart_rate': None,
-    'spo2': None,
-    'accel_magnitude': 0,
-    'gyro_magnitude': 0,
-    'fall_detected': False,
-    'fall_confidence': 0,
-    'timestamp': time.time(),
-    'datetime': datetime.now().strftime('%H:%M:%S'),
-    'device_status': 'offline'
-}
+socketio_options = {'json': ORJSONCodec} if orjson else {}
+socketio = SocketIO(app, cors_allowed_origins=["http://localhost:3000"], **socketio_options)
+
+# CSV logs are written by main.py in the project root, two levels up from backend/
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CSV_PATTERN = os.path.join(BASE_PATH, 'fall_detection_data_*.csv')
+# Compiled once; matches session CSV file names in the directory scan and the watcher
+CSV_NAME_RE = re.compile(r'fall_detection_data_.*\.csv\Z')
+
+# Latest CSV lookup, redone only when the directory's mtime changes
+_csv_cache = {'mtime': None, 'path': None}
+_csv_cache_lock = threading.Lock()
+
+def _latest_csv():
+    """Most recent fall_detection_data_*.csv, or None if there is none"""
+    mtime = os.stat(BASE_PATH).st_mtime_ns
+    with _csv_cache_lock:
+        if mtime != _csv_cache['mtime']:
+            # One scandir pass; on Linux DirEntry.stat() still costs one stat per
+            # entry (scandir only returns d_type), but only matching names are stat'ed
+            latest, latest_ctime = None, None
+            with os.scandir(BASE_PATH) as entries:
+                for entry in entries:
+                    if CSV_NAME_RE.match(entry.name):
+                        ctime = entry.stat().st_ctime_ns
+                        if latest_ctime is None or ctime > latest_ctime:
+                            latest, latest_ctime = entry.path, ctime
+            _csv_cache['path'] = latest
+            _csv_cache['mtime'] = mtime
+        return _csv_cache['path']
+
+# A CSV untouched for this long is a finished session and is moved into Parquet
+CSV_CLOSED_AFTER = 30
+HISTORY_COLUMNS = ['timestamp', 'bpm', 'spo2', 'accel_magnitude', 'gyro_magnitude',
+                   'fall_predicted', 'fall_confidence']
+# Known column types, so read_csv skips inference (float64 keeps the JSON values unchanged).
+# fall_predicted is read as text and mapped to bool after parsing, so a half-written
+# trailing row (live session mid-flush, power loss) can't fail the whole read
+HISTORY_DTYPES = {'timestamp': 'float64', 'bpm': 'float64', 'spo2': 'float64',
+                  'accel_magnitude': 'float64', 'gyro_magnitude': 'float64',
+                  'fall_predicted': 'str', 'fall_confidence': 'float64'}
+FALL_TRUE_VALUES = ('True', '1')
+
+# Finished sessions go into one Hive-partitioned dataset, date=YYYY-MM-DD/<session>-<i>.parquet,
+# so a history scan prunes whole days and then row groups by timestamp
+PARQUET_DIR = os.path.join(BASE_PATH, 'history_parquet')
+# ~10 minutes of 10 Hz samples per row group
+PARQUET_ROW_GROUP = 6000
+
+if PARQUET_AVAILABLE:
+    HISTORY_SCHEMA = pa.schema(
+        [(name, pa.bool_() if name == 'fall_predicted' else pa.from_numpy_dtype(dtype))
+         for name, dtype in HISTORY_DTYPES.items()] +
+        [('session', pa.string()), ('date', pa.string())])
+    HISTORY_PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+# CSV (mtime_ns, size) per session when it was written to PARQUET_DIR, when
+# its conversion failed, and when PARQUET_DIR was last searched for it, so none
+# of these is redone until the CSV changes again
+_converted_sessions = {}
+_failed_sessions = {}
+_scanned_sessions = {}
+
+def _read_history_csv(path, columns):
+    """The given history columns of a session CSV, with fall_predicted as bool"""
+    df = pd.read_csv(path, usecols=columns, dtype=HISTORY_DTYPES, engine='c', on_bad_lines='skip')
+    df['fall_predicted'] = df['fall_predicted'].isin(FALL_TRUE_VALUES)
+    return df
+
+def _session_name(csv_path):
+    return os.path.splitext(os.path.basename(csv_path))[0]
+
+def _csv_fingerprint(csv_path):
+    st = os.stat(csv_path)
+    return st.st_mtime_ns, st.st_size
+
+def _session_files(session):
+    return glob.glob(os.path.join(PARQUET_DIR, 'date=*', glob.escape(session) + '-*.parquet'))
+
+def _csv_closed(fingerprint):
+    """True once the CSV has gone CSV_CLOSED_AFTER seconds without a write"""
+    return time.time() - fingerprint[0] / 1e9 >= CSV_CLOSED_AFTER
+
+def _is_converted(session, fingerprint):
+    """True if the dataset holds the session CSV as it is now"""
+    if session not in _converted_sessions and _scanned_sessions.get(session) != fingerprint:
+        _scanned_sessions[session] = fingerprint
+        # After a restart, trust files written after the CSV's last change
+        files = _session_files(session)
+        if files and min(os.stat(f).st_mtime_ns for f in files) >= fingerprint[0]:
+            _converted_sessions[session] = fingerprint
+    return _converted_sessions.get(session) == fingerprint
+
+def _convert_closed_csv(path):
+    """Add a finished session CSV to the per-day Parquet dataset, redoing it
+    if the CSV has changed since"""
+    if not PARQUET_AVAILABLE:
+        return
+    fingerprint = _csv_fingerprint(path)
+    if not _csv_closed(fingerprint):
+        return
+    session = _session_name(path)
+    if _failed_sessions.get(session) == fingerprint or _is_converted(session, fingerprint):
+        return
+    try:
+        df = _read_history_csv(path, HISTORY_COLUMNS + ['datetime'])
+        # Partition on the logged local date
+        df['date'] = df.pop('datetime').str[:10]
+        df['session'] = session
+        
+        # Drop an out-of-date copy first; history reads the CSV meanwhile
+        _converted_sessions.pop(session, None)
+        for old_file in _session_files(session):
+            os.remove(old_file)
+        ds.write_dataset(
+            pa.Table.from_pandas(df, schema=HISTORY_SCHEMA, preserve_index=False),
+            PARQUET_DIR, format='parquet', partitioning=HISTORY_PARTITIONING,
+            basename_template=session + '-{i}.parquet',
+            max_rows_per_group=PARQUET_ROW_GROUP,
+            existing_data_behavior='overwrite_or_ignore')
+        _converted_sessions[session] = fingerprint
+        print(f"🗜️ Added {session} to the Parquet history")
+    except Exception as e:
+        _failed_sessions[session] = fingerprint
+        print(f"⚠️ Parquet conversion failed for {path}: {e}")
+
+def _load_history(path, cutoff_time):
+    """Rows of the CSV at `path` newer than cutoff_time as a DataFrame, scanning the
+    Parquet dataset with partition and timestamp filters when it holds the current CSV"""
+    session = _session_name(path)
+    fingerprint = _csv_fingerprint(path)
+    # The live session is never in the dataset, so it goes straight to the CSV
+    if PARQUET_AVAILABLE and _csv_closed(fingerprint) and _is_converted(session, fingerprint):
+        try:
+            cutoff_date = datetime.fromtimestamp(max(cutoff_time, 0)).strftime('%Y-%m-%d')
+            dataset = ds.dataset(PARQUET_DIR, format='parquet', schema=HISTORY_SCHEMA,
+                                 partitioning=HISTORY_PARTITIONING)
+            table = dataset.to_table(
+                columns=HISTORY_COLUMNS,
+                filter=(ds.field('date') >= cutoff_date) & (ds.field('session') == session) &
+                       (ds.field('timestamp') > cutoff_time))
+            return table.to_pandas()
+        except Exception as e:
+            print(f"⚠️ Parquet history read failed, using CSV: {e}")
+    
+    df = _read_history_csv(path, HISTORY_COLUMNS)
+    return df[df['timestamp'] > cutoff_time]
+
+def _masked_list(column, valid):
+    """Column values as a list, None where `valid` is False"""
+    return column.astype(object).where(valid, None).tolist()
+
+def _history_rows(recent_data, full=True):
+    """Chart points for the frontend, generated column-wise from the history DataFrame;
+    full=False gives the slimmer rows sent over the websocket"""
+    # JavaScript timestamps
+    ts = (recent_data['timestamp'].to_numpy() * 1000).astype('int64').tolist()
+    # Missing readings become None column-wise, so the row loop only zips values
+    bpm = recent_data['bpm'].astype(float)
+    heart_rate = _masked_list(bpm, bpm > 0)
+    if 'spo2' in recent_data:
+        spo2 = recent_data['spo2']
+        spo2 = _masked_list(spo2, spo2.notna() & (spo2 != ''))
+    else:
+        spo2 = [None] * len(ts)
+    accel = recent_data['accel_magnitude'].astype(float).tolist()
+    
+    if not full:
+        return ({
+            'timestamp': t,
+            'heart_rate': b,
+            'spo2': s,
+            'accel_magnitude': a,
+        } for t, b, s, a in zip(ts, heart_rate, spo2, accel))
+    
+    gyro = recent_data['gyro_magnitude'].astype(float).tolist()
+    falls = recent_data['fall_predicted'].astype(bool).tolist()
+    confidence = recent_data['fall_confidence'].astype(float).tolist()
+    return ({
+        'timestamp': t,
+        'heart_rate': b,
+        'spo2': s,
+        'accel_magnitude': a,
+        'gyro_magnitude': g,
+        'fall_detected': f,
+        'fall_confidence': c
+    } for t, b, s, a, g, f, c in zip(ts, heart_rate, spo2, accel, gyro, falls, confidence))
+
+# Rows encoded per chunk of a streamed history response
+HISTORY_CHUNK_ROWS = 256
+
+def _stream_json_array(rows):
+    """Encode rows as a JSON array, yielding it a chunk at a time"""
+    dumps = app.json.dumps
+    rows = iter(rows)
+    yield '['
+    sep = ''
+    while True:
+        chunk = list(islice(rows, HISTORY_CHUNK_ROWS))
+        if not chunk:
+            break
+        yield sep + ','.join(map(dumps, chunk))
+        sep = ','
+    yield ']'
+
+# Read position in the latest CSV, so each poll only parses newly appended rows
+_tail_state = {'path': None, 'offset': 0, 'header': None, 'last_row': None}
+
+def _read_latest_row(path):
+    """Newest complete row of the CSV at `path` as a dict, reading only bytes
+    appended since the previous call"""
+    state = _tail_state
+    with open(path, 'rb') as f:
+        if path != state['path']:
+            # New session file - start over from its header
+            state.update(path=path, offset=0, header=None, last_row=None)
+        if state['header'] is None:
+            # Header may still be sitting in the writer's buffer; retry next call
+            header = f.readline()
+            if not header.endswith(b'\n'):
+                return None
+            state['header'] = next(csv.reader([header.decode('utf-8')]))
+            state['offset'] = f.tell()
+        
+        f.seek(state['offset'])
+        new_data = f.read()
+    
+    # Only consume complete lines; a partially written row is picked up next time
+    end = new_data.rfind(b'\n')
+    if end >= 0:
+        state['offset'] += end + 1
+        lines = new_data[:end].splitlines()
+        if lines:
+            last_line = lines[-1].decode('utf-8')
+            state['last_row'] = dict(zip(state['header'], next(csv.reader([last_line]))))
+    
+    return state['last_row']
+
+def _clock():
+    return datetime.now().strftime('%H:%M:%S')
+
+@dataclass(frozen=True, slots=True)
+class SensorSnapshot:
+    """Latest sensor readings; frozen, so the updater swaps in a new one"""
+    heart_rate: Optional[float] = None
+    spo2: Optional[float] = None
+    accel_magnitude: float = 0
+    gyro_magnitude: float = 0
+    fall_detected: bool = False
+    fall_confidence: float = 0
+    temperature: Optional[float] = None
+    timestamp: float = field(default_factory=time.time)
+    datetime: str = field(default_factory=_clock)
+    device_status: str = 'offline'
+
+# Single-slot holder for the latest snapshot; readers take _latest_ref[0] once
+_latest_ref = [SensorSnapshot()]
 
 # Initialize AI analyzer
 health_ai = None
@@ -61,6 +357,40 @@ if HEALTH_AI_AVAILABLE:
         print(f"⚠️ AI Analyzer initialization failed: {e}")
         health_ai = None
 
+# Report generation runs here so Gemini round-trips never hold a request thread
+EXECUTOR = ThreadPoolExecutor(max_workers=4)
+# Finished jobs kept for polling; pending jobs are never dropped
+REPORT_JOBS_KEPT = 32
+
+# job_id -> Future of a comprehensive report, oldest first
+_report_jobs = {}
+_report_jobs_lock = threading.Lock()
+
+def _submit_report(csv_path):
+    """Queue a comprehensive report for csv_path; returns (job_id, future)"""
+    job_id = uuid.uuid4().hex
+    future = EXECUTOR.submit(health_ai.generate_comprehensive_report, csv_path)
+    with _report_jobs_lock:
+        _report_jobs[job_id] = future
+        # Forget the oldest finished jobs; pending ones stay pollable
+        finished = [jid for jid, f in _report_jobs.items() if f.done()]
+        for old_id in finished[:max(0, len(_report_jobs) - REPORT_JOBS_KEPT)]:
+            del _report_jobs[old_id]
+    future.add_done_callback(lambda f: _report_done(job_id, f))
+    return job_id, future
+
+def _report_done(job_id, future):
+    """Push a finished report to connected dashboards"""
+    try:
+        report = future.result()
+        if report:
+            socketio.emit('report_ready', {'job_id': job_id, 'report': report})
+        else:
+            socketio.emit('report_ready', {'job_id': job_id, 'error': 'Failed to generate report'})
+    except Exception as e:
+        print(f"❌ Error generating report: {e}")
+        socketio.emit('report_ready', {'job_id': job_id, 'error': str(e)})
+
 # ===== BASIC ROUTES =====
 @app.route('/')
 def index():
@@ -71,6 +401,7 @@ def index():
             "current": "/api/current",
             "history": "/api/history/<minutes>",
             "generate_report": "/api/generate-report",
+            "report_status": "/api/report/<job_id>",
             "quick_analysis": "/api/quick-analysis"
         },
         "ai_status": "Available" if health_ai else "Not Available"
@@ -87,46 +418,25 @@ def api_status():
 @app.route('/api/current')
 def get_current_data():
     """Get current sensor readings"""
-    return jsonify(latest_data)
+    return jsonify(asdict(_latest_ref[0]))
 
 @app.route('/api/history/<int:minutes>')
 def get_history(minutes):
     """Get historical data for charts"""
     try:
-        # Look for CSV files in parent directory (where main.py runs) - go up two levels
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        csv_pattern = os.path.join(base_path, 'fall_detection_data_*.csv')
-        csv_files = glob.glob(csv_pattern)
-        
-        print(f"🔍 Looking for CSV files at: {csv_pattern}")
-        print(f"📁 Found {len(csv_files)} CSV files")
-        
-        if not csv_files:
-            return jsonify([])
-        
         # Get the most recent CSV file
-        latest_csv = max(csv_files, key=os.path.getctime)
-        df = pd.read_csv(latest_csv)
+        latest_csv = _latest_csv()
+        if not latest_csv:
+            return jsonify([])
         
         # Get last N minutes of data
-        if len(df) > 0:
-            cutoff_time = time.time() - (minutes * 60)
-            recent_data = df[df['timestamp'] > cutoff_time]
-            
+        cutoff_time = time.time() - (minutes * 60)
+        recent_data = _load_history(latest_csv, cutoff_time)
+        
+        if len(recent_data) > 0:
             # Format for frontend charts
-            history = []
-            for _, row in recent_data.iterrows():
-                history.append({
-                    'timestamp': int(row['timestamp'] * 1000),  # JavaScript timestamp
-                    'heart_rate': float(row['bpm']) if row['bpm'] > 0 else None,
-                    'spo2': row.get('spo2', None) if pd.notna(row.get('spo2', None)) and row.get('spo2', '') != '' else None,
-                    'accel_magnitude': float(row['accel_magnitude']),
-                    'gyro_magnitude': float(row['gyro_magnitude']),
-                    'fall_detected': bool(row['fall_predicted']),
-                    'fall_confidence': float(row['fall_confidence'])
-                })
-            
-            return jsonify(history)
+            return Response(stream_with_context(_stream_json_array(_history_rows(recent_data))),
+                            mimetype='application/json')
         
         return jsonify([])
         
@@ -148,26 +458,29 @@ def generate_health_report():
                 'details': 'Gemini API key not configured or health_analyzer.py not found'
             }), 500
         
-        # Find the most recent CSV file - go up two levels from backend folder
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        csv_pattern = os.path.join(base_path, 'fall_detection_data_*.csv')
-        csv_files = glob.glob(csv_pattern)
+        # Find the most recent CSV file
+        latest_csv = _latest_csv()
         
-        print(f"🔍 Looking for CSV files at: {csv_pattern}")
-        print(f"📁 Found {len(csv_files)} CSV files")
-        
-        if not csv_files:
-            print("❌ No CSV files found")
+        if not latest_csv:
+            print(f"❌ No CSV files found at: {CSV_PATTERN}")
             return jsonify({
                 'error': 'No data files found',
-                'searched_path': csv_pattern
+                'searched_path': CSV_PATTERN
             }), 404
         
-        latest_csv = max(csv_files, key=os.path.getctime)
         print(f"📄 Using CSV file: {latest_csv}")
         
-        # Generate comprehensive report
-        report = health_ai.generate_comprehensive_report(latest_csv)
+        # Generate comprehensive report in the background
+        job_id, future = _submit_report(latest_csv)
+        if request.args.get('async'):
+            # Caller polls /api/report/<job_id> or listens for 'report_ready'
+            return jsonify({
+                'job_id': job_id,
+                'status': 'pending',
+                'status_url': f'/api/report/{job_id}'
+            }), 202
+        
+        report = future.result()
         
         if report:
             print("✅ Report generated successfully")
@@ -182,6 +495,25 @@ def generate_health_report():
         traceback.print_exc()
         return jsonify({'error': str(e), 'type': 'server_error'}), 500
 
+@app.route('/api/report/<job_id>')
+def get_report_status(job_id):
+    """Status, and once done the result, of a background report job"""
+    with _report_jobs_lock:
+        future = _report_jobs.get(job_id)
+    
+    if future is None:
+        return jsonify({'error': 'Unknown report job', 'job_id': job_id}), 404
+    if not future.done():
+        return jsonify({'job_id': job_id, 'status': 'pending'}), 202
+    
+    try:
+        report = future.result()
+    except Exception as e:
+        return jsonify({'error': str(e), 'type': 'server_error'}), 500
+    if not report:
+        return jsonify({'error': 'Failed to generate report'}), 500
+    return jsonify(report)
+
 @app.route('/api/quick-analysis', methods=['GET', 'POST'])
 def quick_analysis():
     """Get quick health analysis without full AI report"""
@@ -191,14 +523,10 @@ def quick_analysis():
         if not health_ai:
             return jsonify({'error': 'AI analyzer not available'}), 500
         
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        csv_pattern = os.path.join(base_path, 'fall_detection_data_*.csv')
-        csv_files = glob.glob(csv_pattern)
-        
-        if not csv_files:
+        latest_csv = _latest_csv()
+        if not latest_csv:
             return jsonify({'error': 'No data files found'}), 404
         
-        latest_csv = max(csv_files, key=os.path.getctime)
         analysis = health_ai.analyze_csv_data(latest_csv)
         
         return jsonify(analysis)
@@ -208,48 +536,85 @@ def quick_analysis():
         return jsonify({'error': str(e)}), 500
 
 # ===== BACKGROUND DATA PROCESSING =====
+# With watchdog the update loop sleeps until a session CSV is written, waking at
+# least this often to refresh the offline status and convert finished sessions
+SENSOR_IDLE_TIMEOUT = 5
+
+_csv_changed = threading.Event()
+
+def _start_csv_watch():
+    """Watch BASE_PATH for session CSV writes; returns False if watchdog is missing"""
+    if Observer is None:
+        return False
+    
+    class CSVChangeHandler(FileSystemEventHandler):
+        # Only writes and new files; open/close events would include our own reads
+        def on_modified(self, event):
+            if not event.is_directory and CSV_NAME_RE.match(os.path.basename(event.src_path)):
+                _csv_changed.set()
+        
+        on_created = on_modified
+    
+    observer = Observer()
+    observer.schedule(CSVChangeHandler(), BASE_PATH, recursive=False)
+    observer.daemon = True
+    observer.start()
+    print("👀 Watching for new sensor data")
+    return True
+
 def update_sensor_data():
-    """Background thread to read sensor data and emit real-time updates"""
+    """Background task to read sensor data and emit real-time updates"""
     print("📡 Starting sensor data monitoring...")
+    watching = _start_csv_watch()
+    # Last row turned into a snapshot, and the fields last sent to clients
+    last_row, sent = None, asdict(_latest_ref[0])
     
     while True:
         try:
-            # Look for the most recent CSV file - go up two levels from backend
-            base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            csv_pattern = os.path.join(base_path, 'fall_detection_data_*.csv')
-            csv_files = glob.glob(csv_pattern)
+            # Cleared before reading, so a write landing mid-iteration wakes the next wait
+            _csv_changed.clear()
             
-            if csv_files:
-                latest_csv = max(csv_files, key=os.path.getctime)
-                df = pd.read_csv(latest_csv)
+            # Look for the most recent CSV file
+            latest_csv = _latest_csv()
+            
+            if latest_csv:
+                latest_row = _read_latest_row(latest_csv)
                 
-                if len(df) > 0:
-                    # Get the last row (most recent data)
-                    latest_row = df.iloc[-1]
+                # Only rows that are actually new produce an update
+                if latest_row and latest_row is not last_row:
+                    last_row = latest_row
+                    bpm = float(latest_row['bpm'] or 0)
+                    spo2 = latest_row.get('spo2', '')
                     
-                    # Update global data
-                    global latest_data
-                    latest_data = {
-                        'heart_rate': float(latest_row['bpm']) if latest_row['bpm'] > 0 else None,
-                        'spo2': latest_row.get('spo2', None) if pd.notna(latest_row.get('spo2', None)) and latest_row.get('spo2', '') != '' else None,
-                        'accel_magnitude': float(latest_row['accel_magnitude']),
-                        'gyro_magnitude': float(latest_row['gyro_magnitude']),
-                        'fall_detected': bool(latest_row['fall_predicted']),
-                        'fall_confidence': float(latest_row['fall_confidence']),
-                        'temperature': float(latest_row['temp']),
-                        'timestamp': time.time(),
-                        'datetime': datetime.now().strftime('%H:%M:%S'),
-                        'device_status': 'online'
-                    }
+                    # Build the new snapshot fully, then swap it in
+                    snapshot = SensorSnapshot(
+                        heart_rate=bpm if bpm > 0 else None,
+                        spo2=float(spo2) if spo2 not in ('', 'nan') else None,
+                        accel_magnitude=float(latest_row['accel_magnitude']),
+                        gyro_magnitude=float(latest_row['gyro_magnitude']),
+                        fall_detected=latest_row['fall_predicted'] in FALL_TRUE_VALUES,
+                        fall_confidence=float(latest_row['fall_confidence']),
+                        temperature=float(latest_row['temp']),
+                        device_status='online'
+                    )
+                    _latest_ref[0] = snapshot
                     
-                    # Emit to all connected WebSocket clients
-                    socketio.emit('sensor_update', latest_data)
+                    # Send connected clients only the fields that changed; they get
+                    # the full snapshot as 'sensor_update' when they connect
+                    current = asdict(snapshot)
+                    socketio.emit('sensor_delta', {k: v for k, v in current.items() if sent.get(k) != v})
+                    sent = current
+                
+                # Once logging stops, history switches to a columnar copy
+                _convert_closed_csv(latest_csv)
             else:
                 # No CSV files found - sensor might be offline
-                latest_data['device_status'] = 'offline'
-                latest_data['datetime'] = datetime.now().strftime('%H:%M:%S')
+                _latest_ref[0] = replace(_latest_ref[0], device_status='offline', datetime=_clock())
             
-            time.sleep(1)  # Update every second
+            if watching:
+                _csv_changed.wait(SENSOR_IDLE_TIMEOUT)
+            else:
+                time.sleep(1)  # Update every second
             
         except Exception as e:
             print(f"❌ Error in sensor monitoring: {e}")
@@ -259,7 +624,7 @@ def update_sensor_data():
 @socketio.on('connect')
 def handle_connect():
     print(f"👤 Client connected from dashboard")
-    emit('sensor_update', latest_data)
+    emit('sensor_update', asdict(_latest_ref[0]))
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -270,27 +635,13 @@ def handle_history_request(data):
     """Handle real-time history requests"""
     minutes = data.get('minutes', 10)
     try:
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        csv_pattern = os.path.join(base_path, 'fall_detection_data_*.csv')
-        csv_files = glob.glob(csv_pattern)
+        latest_csv = _latest_csv()
         
-        if csv_files:
-            latest_csv = max(csv_files, key=os.path.getctime)
-            df = pd.read_csv(latest_csv)
-            
+        if latest_csv:
             cutoff_time = time.time() - (minutes * 60)
-            recent_data = df[df['timestamp'] > cutoff_time]
-            
-            history = []
-            for _, row in recent_data.iterrows():
-                history.append({
-                    'timestamp': int(row['timestamp'] * 1000),
-                    'heart_rate': float(row['bpm']) if row['bpm'] > 0 else None,
-                    'spo2': row.get('spo2', None) if pd.notna(row.get('spo2', None)) and row.get('spo2', '') != '' else None,
-                    'accel_magnitude': float(row['accel_magnitude']),
-                })
+            recent_data = _load_history(latest_csv, cutoff_time)
             
-            emit('history_data', history)
+            emit('history_data', list(_history_rows(recent_data, full=False)))
     except Exception as e:
         print(f"Error sending history: {e}")
 
@@ -301,10 +652,8 @@ if __name__ == '__main__':
     print("🌐 CORS enabled for frontend connections")
     print(f"🤖 AI Health Analyzer: {'Available' if health_ai else 'Not Available'}")
     
-    # Start background sensor monitoring thread
-    sensor_thread = threading.Thread(target=update_sensor_data)
-    sensor_thread.daemon = True
-    sensor_thread.start()
+    # Start background sensor monitoring (a green thread under eventlet/gevent)
+    socketio.start_background_task(update_sensor_data)
     
     # List available routes for debugging
     print("\n📋 Available API endpoints:")
@@ -4,33 +4,114 @@ import pandas as pd
 import numpy as np
 import json
 import os
+import time
 from datetime import datetime, timedelta
 import glob
+import hashlib
+import pickle
+import typing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# pyarrow is optional - its CSV reader is multi-threaded and memory-maps the file
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa_csv = None
+
+# Columns the session analysis reads, with their types so read_csv skips inference.
+# fall_predicted is read as text and mapped to bool afterwards, so a half-written
+# trailing row in a live session can't fail the parse
+ANALYSIS_DTYPES = {
+    'timestamp': 'float64', 'datetime': 'str', 'temp': 'float64', 'bpm': 'float64',
+    'spo2': 'float64', 'fall_predicted': 'str', 'fall_confidence': 'float64',
+    'accel_magnitude': 'float64'
+}
+FALL_TRUE_VALUES = ('True', '1')
+
+# Finished reports, kept in memory and pickled to disk, keyed on the CSV fingerprint
+REPORT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+REPORT_CACHE_SIZE = 32
+# Only sessions idle this long (i.e. finished) are pickled; live ones stay in memory
+REPORT_DISK_AFTER = 30
+
+# gRPC keeps one persistent channel, so repeat report calls skip the TLS handshake
+GEMINI_TRANSPORT = os.getenv('GEMINI_TRANSPORT', 'grpc')
+
+# Longest list (e.g. fall timestamps) included in the Gemini prompt
+PROMPT_MAX_LIST = 10
+# Keys left out of the prompt because they restate other values
+PROMPT_DERIVED_KEYS = {'false_positive_risk'}
+
+def _prompt_json(section):
+    """Compact JSON for one analysis section, with long lists capped"""
+    compact = {}
+    for key, value in section.items():
+        if key in PROMPT_DERIVED_KEYS:
+            continue
+        if isinstance(value, list) and len(value) > PROMPT_MAX_LIST:
+            value = value[:PROMPT_MAX_LIST] + [f"... {len(value) - PROMPT_MAX_LIST} more"]
+        compact[key] = value
+    return json.dumps(compact, separators=(',', ':'))
+
+class ReportRecommendation(typing.TypedDict):
+    category: str
+    advice: str
+    priority: str
+
+class AIReport(typing.TypedDict):
+    """Shape of the Gemini report, enforced through structured output"""
+    health_status: str
+    key_findings: list[str]
+    recommendations: list[ReportRecommendation]
+    risk_level: str
+    risk_factors: list[str]
+    next_steps: list[str]
 
 class HealthAnalyzer:
     def __init__(self, gemini_api_key):
         """Initialize Gemini AI for health analysis"""
-        genai.configure(api_key=gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        genai.configure(api_key=gemini_api_key, transport=GEMINI_TRANSPORT)
+        # One model (and channel) shared by every report worker thread;
+        # JSON mode with a schema, so the response parses directly
+        self.model = genai.GenerativeModel(
+            'gemini-1.5-flash',
+            generation_config=genai.GenerationConfig(
+                response_mime_type='application/json',
+                response_schema=AIReport))
+        # Last parsed session as one ((path, mtime_ns, size), DataFrame) pair,
+        # swapped as a whole so a reader never pairs a key with another file's frame
+        self._session = (None, None)
+        # Report cache and in-flight report futures, shared by the report workers
+        self._lock = threading.Lock()
+        self._report_cache = OrderedDict()
+        self._in_flight = {}
         print("🤖 AI Health Analyzer initialized with Gemini")
     
     def analyze_csv_data(self, csv_file_path):
         """Analyze CSV data and extract health insights"""
         try:
-            df = pd.read_csv(csv_file_path)
+            df = self._load_session(csv_file_path)
+            
+            # Pull each column out once; all sections share these arrays
+            cols = {name: df[name].to_numpy() for name in ANALYSIS_DTYPES}
+            ts, dt = cols['timestamp'], cols['datetime']
+            n = len(ts)
             
             # Calculate health metrics
             analysis = {
                 'session_info': {
-                    'duration_minutes': float((df['timestamp'].max() - df['timestamp'].min()) / 60),
-                    'total_samples': int(len(df)),
-                    'start_time': df.iloc[0]['datetime'] if len(df) > 0 else 'Unknown',
-                    'end_time': df.iloc[-1]['datetime'] if len(df) > 0 else 'Unknown'
+                    'duration_minutes': float((np.nanmax(ts) - np.nanmin(ts)) / 60) if n else float('nan'),
+                    'total_samples': int(n),
+                    'start_time': dt[0] if n > 0 else 'Unknown',
+                    'end_time': dt[-1] if n > 0 else 'Unknown'
                 },
-                'heart_rate': self._analyze_heart_rate(df),
-                'movement': self._analyze_movement(df),
-                'fall_detection': self._analyze_fall_events(df),
-                'vital_signs': self._analyze_vital_signs(df),
+                'heart_rate': self._analyze_heart_rate(cols, n),
+                'movement': self._analyze_movement(cols, n),
+                'fall_detection': self._analyze_fall_events(cols, n),
+                'vital_signs': self._analyze_vital_signs(cols, n),
                 'recommendations': []
             }
             
@@ -40,9 +121,38 @@ class HealthAnalyzer:
             print(f"❌ Error analyzing CSV: {e}")
             return None
     
-    def _analyze_heart_rate(self, df):
+    def _load_session(self, csv_file_path):
+        """Parse the session CSV once, reusing the DataFrame until the file changes"""
+        st = os.stat(csv_file_path)
+        key = (csv_file_path, st.st_mtime_ns, st.st_size)
+        cached_key, cached_df = self._session
+        if key == cached_key:
+            return cached_df
+        
+        if pa_csv is not None:
+            table = pa_csv.read_csv(
+                csv_file_path,
+                read_options=pa_csv.ReadOptions(use_threads=True),
+                # Rows with the wrong field count (a cut-off last line) are dropped
+                parse_options=pa_csv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=list(ANALYSIS_DTYPES),
+                    column_types={name: pa.string() if dtype == 'str' else pa.from_numpy_dtype(dtype)
+                                  for name, dtype in ANALYSIS_DTYPES.items()}))
+            df = table.to_pandas()
+        else:
+            df = pd.read_csv(csv_file_path, usecols=list(ANALYSIS_DTYPES),
+                             dtype=ANALYSIS_DTYPES, engine='c', on_bad_lines='skip')
+        df['fall_predicted'] = df['fall_predicted'].isin(FALL_TRUE_VALUES)
+        
+        self._session = (key, df)
+        return df
+    
+    def _analyze_heart_rate(self, cols, n):
         """Analyze heart rate patterns"""
-        valid_hr = df[df['bpm'] > 0]['bpm']
+        # Filter once; every statistic below runs on the same NumPy array
+        hr = cols['bpm']
+        valid_hr = hr[hr > 0]
         
         if len(valid_hr) == 0:
             return {
@@ -51,61 +161,67 @@ class HealthAnalyzer:
                 'coverage': 0
             }
         
+        # Zone counts in one binning pass: <70, 70-85, >=85
+        resting, moderate, elevated = np.bincount(np.digitize(valid_hr, [70, 85]), minlength=3)
+        
         return {
             'status': 'analyzed',
             'average': round(float(valid_hr.mean()), 1),
             'min': round(float(valid_hr.min()), 1),
             'max': round(float(valid_hr.max()), 1),
-            'coverage': round(float(len(valid_hr) / len(df) * 100), 1),
-            'variability': round(float(valid_hr.std()), 1) if len(valid_hr) > 1 else 0,
+            'coverage': round(float(len(valid_hr) / n * 100), 1),
+            'variability': round(float(valid_hr.std(ddof=1)), 1) if len(valid_hr) > 1 else 0,
             'zones': {
-                'resting': int(len(valid_hr[valid_hr < 70])),
-                'moderate': int(len(valid_hr[(valid_hr >= 70) & (valid_hr < 85)])),
-                'elevated': int(len(valid_hr[valid_hr >= 85]))
+                'resting': int(resting),
+                'moderate': int(moderate),
+                'elevated': int(elevated)
             }
         }
     
-    def _analyze_movement(self, df):
+    def _analyze_movement(self, cols, n):
         """Analyze movement and activity patterns"""
+        accel = cols['accel_magnitude']
+        avg_accel = np.nanmean(accel) if n else np.nan
+        
         return {
-            'avg_acceleration': round(float(df['accel_magnitude'].mean()), 3),
-            'max_acceleration': round(float(df['accel_magnitude'].max()), 3),
-            'movement_variance': round(float(df['accel_magnitude'].std()), 3),
-            'high_movement_events': int(len(df[df['accel_magnitude'] > 1.5])),
-            'activity_level': self._classify_activity_level(df['accel_magnitude'])
+            'avg_acceleration': round(float(avg_accel), 3),
+            'max_acceleration': round(float(np.nanmax(accel) if n else np.nan), 3),
+            'movement_variance': round(float(np.nanstd(accel, ddof=1) if n > 1 else np.nan), 3),
+            'high_movement_events': int((accel > 1.5).sum()),
+            'activity_level': self._classify_activity_level(avg_accel)
         }
     
-    def _analyze_fall_events(self, df):
+    def _analyze_fall_events(self, cols, n):
         """Analyze fall detection results"""
-        fall_events = df[df['fall_predicted'] == True]
+        fall_times = cols['datetime'][cols['fall_predicted'] == True]
         
         return {
-            'total_falls_detected': int(len(fall_events)),
-            'fall_timestamps': fall_events['datetime'].tolist() if len(fall_events) > 0 else [],
-            'avg_confidence': round(float(df['fall_confidence'].mean()), 3),
-            'false_positive_risk': 'low' if len(fall_events) == 0 else 'moderate'
+            'total_falls_detected': int(len(fall_times)),
+            'fall_timestamps': fall_times.tolist(),
+            'avg_confidence': round(float(np.nanmean(cols['fall_confidence']) if n else np.nan), 3),
+            'false_positive_risk': 'low' if len(fall_times) == 0 else 'moderate'
         }
     
-    def _analyze_vital_signs(self, df):
+    def _analyze_vital_signs(self, cols, n):
         """Analyze SpO2 and other vitals"""
-        valid_spo2 = df[df['spo2'].notna() & (df['spo2'] != '')]['spo2']
+        spo2 = cols['spo2'].astype(float, copy=False)
+        valid_spo2 = spo2[~np.isnan(spo2)]
+        temp = cols['temp']
         
         return {
             'spo2': {
                 'available': len(valid_spo2) > 0,
                 'average': round(float(valid_spo2.mean()), 1) if len(valid_spo2) > 0 else None,
-                'coverage': round(float(len(valid_spo2) / len(df) * 100), 1) if len(valid_spo2) > 0 else 0
+                'coverage': round(float(len(valid_spo2) / n * 100), 1) if len(valid_spo2) > 0 else 0
             },
             'temperature': {
-                'average': round(float(df['temp'].mean()), 1),
-                'stable': bool(df['temp'].std() < 1.0)
+                'average': round(float(np.nanmean(temp) if n else np.nan), 1),
+                'stable': bool(n > 1 and np.nanstd(temp, ddof=1) < 1.0)
             }
         }
     
-    def _classify_activity_level(self, accel_data):
-        """Classify overall activity level"""
-        avg_accel = accel_data.mean()
-        
+    def _classify_activity_level(self, avg_accel):
+        """Classify overall activity level from the mean acceleration"""
         if avg_accel < 0.9:
             return 'sedentary'
         elif avg_accel < 1.2:
@@ -117,6 +233,10 @@ class HealthAnalyzer:
     
     def generate_ai_report(self, analysis_data, user_profile=None):
         """Generate AI-powered health report using Gemini"""
+        return self._request_ai_report(analysis_data, user_profile)[0]
+    
+    def _request_ai_report(self, analysis_data, user_profile=None):
+        """Gemini report as (report, ok); ok is False for the canned fallbacks"""
         
         # Create a comprehensive prompt for Gemini
         prompt = f"""
@@ -128,16 +248,16 @@ class HealthAnalyzer:
         - Time Period: {analysis_data['session_info']['start_time']} to {analysis_data['session_info']['end_time']}
 
         **HEART RATE ANALYSIS:**
-        {json.dumps(analysis_data['heart_rate'], indent=2)}
+        {_prompt_json(analysis_data['heart_rate'])}
 
         **MOVEMENT & ACTIVITY:**
-        {json.dumps(analysis_data['movement'], indent=2)}
+        {_prompt_json(analysis_data['movement'])}
 
         **FALL DETECTION:**
-        {json.dumps(analysis_data['fall_detection'], indent=2)}
+        {_prompt_json(analysis_data['fall_detection'])}
 
         **VITAL SIGNS:**
-        {json.dumps(analysis_data['vital_signs'], indent=2)}
+        {_prompt_json(analysis_data['vital_signs'])}
 
         **PLEASE PROVIDE:**
 
@@ -162,21 +282,7 @@ class HealthAnalyzer:
         - Key risk factors identified
         - Preventive measures
 
-        **RESPONSE FORMAT:** Please structure your response as a JSON object with these sections:
-        {{
-            "health_status": "overall assessment text",
-            "key_findings": ["finding 1", "finding 2", "finding 3"],
-            "recommendations": [
-                {{
-                    "category": "immediate",
-                    "advice": "specific advice text",
-                    "priority": "high/medium/low"
-                }}
-            ],
-            "risk_level": "low/medium/high",
-            "risk_factors": ["factor 1", "factor 2"],
-            "next_steps": ["step 1", "step 2"]
-        }}
+        **RESPONSE FORMAT:** JSON per the response schema; recommendation priority and risk_level are "high", "medium" or "low".
 
         Focus on practical, actionable insights that can improve health and safety.
         """
@@ -187,29 +293,11 @@ class HealthAnalyzer:
             
             # Try to parse JSON response
             try:
-                # Extract JSON from response
-                response_text = response.text
-                
-                # Find JSON content (sometimes Gemini adds extra text)
-                start_idx = response_text.find('{')
-                end_idx = response_text.rfind('}') + 1
-                
-                if start_idx != -1 and end_idx != -1:
-                    json_text = response_text[start_idx:end_idx]
-                    ai_report = json.loads(json_text)
-                else:
-                    # Fallback to raw text if JSON parsing fails
-                    ai_report = {
-                        "health_status": response_text,
-                        "key_findings": ["AI analysis completed"],
-                        "recommendations": [{"category": "general", "advice": response_text[:200], "priority": "medium"}],
-                        "risk_level": "medium",
-                        "risk_factors": ["Insufficient data for detailed analysis"],
-                        "next_steps": ["Continue monitoring", "Consult healthcare provider"]
-                    }
+                # Structured output: the response body is the report JSON
+                ai_report = json.loads(response.text)
                 
                 print("✅ AI health report generated successfully")
-                return ai_report
+                return ai_report, True
                 
             except json.JSONDecodeError:
                 # Return structured fallback
@@ -226,7 +314,7 @@ class HealthAnalyzer:
                     "risk_level": "medium",
                     "risk_factors": ["Analysis based on limited session data"],
                     "next_steps": ["Continue regular monitoring", "Maintain healthy lifestyle"]
-                }
+                }, False
                 
         except Exception as e:
             print(f"❌ Error generating AI report: {e}")
@@ -243,19 +331,90 @@ class HealthAnalyzer:
                 "risk_level": "low",
                 "risk_factors": ["Limited data for comprehensive analysis"],
                 "next_steps": ["Extend monitoring duration", "Ensure proper sensor placement"]
-            }
+            }, False
     
     def generate_comprehensive_report(self, csv_file_path, user_profile=None):
-        """Generate complete health report with AI insights"""
+        """Generate complete health report with AI insights, reusing the cached
+        report when the CSV is unchanged since it was last generated. Safe to call
+        from several threads; concurrent calls for the same file share one run"""
+        st = os.stat(csv_file_path)
+        key = (os.path.abspath(csv_file_path), st.st_mtime_ns, st.st_size,
+               json.dumps(user_profile, sort_keys=True))
+        
+        with self._lock:
+            report = self._report_cache.get(key)
+            if report is not None:
+                self._report_cache.move_to_end(key)
+                print("♻️ Returning cached health report")
+                return report
+            
+            pending = self._in_flight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._in_flight[key] = Future()
+        
+        if not owner:
+            print("⏳ Same report already being generated, waiting for it")
+            return pending.result()
+        
+        try:
+            report = self._cached_or_build(key, st, csv_file_path, user_profile)
+            pending.set_result(report)
+            return report
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+    
+    def _cached_or_build(self, key, st, csv_file_path, user_profile):
+        """Report from the disk cache, or a freshly built one (cached if Gemini answered)"""
+        cache_file = os.path.join(REPORT_CACHE_DIR, f"report_{hashlib.sha1(repr(key).encode()).hexdigest()}.pkl")
+        try:
+            with open(cache_file, 'rb') as f:
+                report = pickle.load(f)
+            print("♻️ Returning cached health report from disk")
+        except (OSError, pickle.PickleError, EOFError):
+            report, ai_ok = self._build_comprehensive_report(csv_file_path, user_profile)
+            # Fallback reports from a failed Gemini call are never cached
+            if not ai_ok:
+                return report
+            if time.time() - st.st_mtime >= REPORT_DISK_AFTER:
+                self._save_report(cache_file, report)
+        
+        if report:
+            with self._lock:
+                self._report_cache[key] = report
+                if len(self._report_cache) > REPORT_CACHE_SIZE:
+                    self._report_cache.popitem(last=False)
+        return report
+    
+    def _save_report(self, cache_file, report):
+        """Pickle a report, keeping only the newest REPORT_CACHE_SIZE files on disk"""
+        try:
+            os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+            with open(cache_file, 'wb') as f:
+                pickle.dump(report, f)
+            
+            cached = sorted(glob.glob(os.path.join(REPORT_CACHE_DIR, 'report_*.pkl')), key=os.path.getmtime)
+            for old_file in cached[:-REPORT_CACHE_SIZE]:
+                os.remove(old_file)
+        except OSError as e:
+            print(f"⚠️ Could not write report cache: {e}")
+    
+    def _build_comprehensive_report(self, csv_file_path, user_profile=None):
+        """Run the data analysis and Gemini report for one CSV; returns
+        (report, ai_ok) where ai_ok is False if Gemini fell back"""
         
         # Step 1: Analyze raw data
         analysis = self.analyze_csv_data(csv_file_path)
         
         if not analysis:
-            return None
+            return None, False
         
         # Step 2: Generate AI insights
-        ai_report = self.generate_ai_report(analysis, user_profile)
+        ai_report, ai_ok = self._request_ai_report(analysis, user_profile)
         
         # Step 3: Combine everything
         comprehensive_report = {
@@ -273,7 +432,7 @@ class HealthAnalyzer:
             'recommendations_summary': self._create_recommendation_summary(ai_report)
         }
         
-        return comprehensive_report
+        return comprehensive_report, ai_ok
     
     def _create_recommendation_summary(self, ai_report):
         """Create a summary of key recommendations"""
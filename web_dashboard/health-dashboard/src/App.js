@@ -162,6 +162,7 @@ const Dashboard = () => {
   const [isConnected, setIsConnected] = useState(false);
   const [connectionQuality, setConnectionQuality] = useState('good');
   const socketRef = useRef();
+  const latestRef = useRef({});
   
   useEffect(() => {
     // Connect to Flask backend
@@ -181,6 +182,15 @@ const Dashboard = () => {
     
     socketRef.current.on('sensor_update', (data) => {
       console.log('📡 Received sensor data:', data);
+      latestRef.current = data;
+      setCurrentData(data);
+      updateChartData(data);
+    });
+
+    // After the initial snapshot the backend only sends fields that changed
+    socketRef.current.on('sensor_delta', (delta) => {
+      const data = { ...latestRef.current, ...delta };
+      latestRef.current = data;
       setCurrentData(data);
       updateChartData(data);
     });
@@ -26,11 +26,21 @@ const HealthReport = () => {
     setError(null);
     
     try {
-      const response = await fetch('http://localhost:5000/api/generate-report');
+      // Report is generated in the background; poll its job until it is done
+      let response = await fetch('http://localhost:5000/api/generate-report?async=1');
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
-      
+
+      const { status_url } = await response.json();
+      do {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        response = await fetch(`http://localhost:5000${status_url}`);
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+      } while (response.status === 202);
+
       const reportData = await response.json();
       setReport(reportData);
       setLastGenerated(new Date());